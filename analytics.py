@@ -0,0 +1,205 @@
+# analytics.py
+# Daily/weekly stats aggregates, merged incrementally from raw `stats` rows past a watermark.
+import logging
+import os
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import Dict, Optional
+from zoneinfo import ZoneInfo
+
+import pandas as pd
+
+from data_access import STATS_CACHE_TTL, ReferenceCache
+from db import pooled_cursor
+from schema import STATS_MERGE_LOCK_ID
+
+ANALYTICS_TZ = os.getenv("ANALYTICS_TZ", "Asia/Jerusalem")
+ANALYTICS_MERGE_BATCH = int(os.getenv("ANALYTICS_MERGE_BATCH", "100000"))
+# raw rows older than this are deleted once merged; 0 keeps them forever
+ANALYTICS_RAW_RETENTION_DAYS = int(os.getenv("ANALYTICS_RAW_RETENTION_DAYS", "60"))
+ANALYTICS_PRUNE_INTERVAL = float(os.getenv("ANALYTICS_PRUNE_INTERVAL", "3600"))
+ANALYTICS_PRUNE_BATCH = int(os.getenv("ANALYTICS_PRUNE_BATCH", "10000"))
+
+GROUP_COLUMNS = ("institution", "year", "core_area")
+
+log = logging.getLogger(__name__)
+
+_cache = ReferenceCache(STATS_CACHE_TTL)
+
+# weeks start on Sunday (DOW 0), matching week_start(); empty values bucket as '—' like insert_stat_rows
+_MERGE_SQL = """
+    WITH batch AS (
+        SELECT (COALESCE(created_at, NOW()) AT TIME ZONE %(tz)s)::date AS day,
+               COALESCE(NULLIF(institution, ''), '—') AS institution,
+               COALESCE(year, 0) AS year,
+               COALESCE(NULLIF(core_area, ''), '—') AS core_area
+        FROM stats
+        WHERE id > %(lo)s AND id <= %(hi)s
+    ), daily AS (
+        INSERT INTO stats_daily (day, institution, year, core_area, count)
+        SELECT day, institution, year, core_area, COUNT(*)
+        FROM batch GROUP BY 1, 2, 3, 4
+        ON CONFLICT (day, institution, year, core_area)
+        DO UPDATE SET count = stats_daily.count + EXCLUDED.count
+    )
+    INSERT INTO stats_weekly (week, institution, year, core_area, count)
+    SELECT day - EXTRACT(DOW FROM day)::int, institution, year, core_area, COUNT(*)
+    FROM batch GROUP BY 1, 2, 3, 4
+    ON CONFLICT (week, institution, year, core_area)
+    DO UPDATE SET count = stats_weekly.count + EXCLUDED.count
+"""
+
+
+def today() -> date:
+    return datetime.now(ZoneInfo(ANALYTICS_TZ)).date()
+
+
+def week_start(day: Optional[date] = None) -> date:
+    day = day or today()
+    return day - timedelta(days=(day.weekday() + 1) % 7)
+
+
+def merge_stats(batch: int = ANALYTICS_MERGE_BATCH) -> int:
+    """Fold raw stats rows past the watermark into stats_daily/stats_weekly; returns rows merged."""
+    merged = 0
+    while True:
+        with pooled_cursor() as cur:
+            # waits for in-flight stats inserts (shared holders) and blocks new ones until commit
+            cur.execute("SELECT pg_advisory_xact_lock(%s);", (STATS_MERGE_LOCK_ID,))
+            cur.execute("SELECT last_id FROM stats_watermark WHERE id = 1 FOR UPDATE;")
+            lo = cur.fetchone()["last_id"]
+            cur.execute("""
+                SELECT MAX(id) AS hi, COUNT(*) AS n
+                FROM (SELECT id FROM stats WHERE id > %s ORDER BY id LIMIT %s) s
+            """, (lo, batch))
+            row = cur.fetchone()
+            if row["hi"] is None:
+                break
+            cur.execute(_MERGE_SQL, {"tz": ANALYTICS_TZ, "lo": lo, "hi": row["hi"]})
+            cur.execute("UPDATE stats_watermark SET last_id = %s, merged_at = NOW() WHERE id = 1;", (row["hi"],))
+            merged += row["n"]
+    if merged:
+        _cache.invalidate()
+    return merged
+
+
+def prune_stats(retention_days: int = ANALYTICS_RAW_RETENTION_DAYS, batch: int = ANALYTICS_PRUNE_BATCH) -> int:
+    """Delete merged raw rows older than the retention window, in short batches; returns rows deleted."""
+    if retention_days <= 0:
+        return 0
+    deleted = 0
+    while True:
+        with pooled_cursor() as cur:
+            # only rows at or below the watermark: everything newer is not in the aggregates yet
+            cur.execute("""
+                DELETE FROM stats
+                WHERE id IN (
+                    SELECT id FROM stats
+                    WHERE id <= (SELECT last_id FROM stats_watermark WHERE id = 1)
+                      AND created_at < NOW() - make_interval(days => %s)
+                    ORDER BY id
+                    LIMIT %s
+                )
+            """, (retention_days, batch))
+            n = cur.rowcount
+        deleted += n
+        if n < batch:
+            return deleted
+
+
+_last_prune = 0.0
+_maintenance_lock = threading.Lock()
+
+
+def run_maintenance() -> Dict[str, int]:
+    """Merge new stats rows and, at most every ANALYTICS_PRUNE_INTERVAL seconds, prune old ones."""
+    global _last_prune
+    with _maintenance_lock:
+        result = {"merged": merge_stats(), "pruned": 0}
+        if time.monotonic() - _last_prune >= ANALYTICS_PRUNE_INTERVAL:
+            _last_prune = time.monotonic()
+            result["pruned"] = prune_stats()
+        if result["merged"] or result["pruned"]:
+            log.info("stats maintenance: merged %(merged)d, pruned %(pruned)d raw rows", result)
+        return result
+
+
+def _group_df(rows, extra=()) -> pd.DataFrame:
+    return pd.DataFrame(rows, columns=[*GROUP_COLUMNS, *extra])
+
+
+def top_this_week(limit: int = 10) -> pd.DataFrame:
+    """(institution, year, core_area) groups most selected since the start of the current week."""
+    week = week_start()
+
+    def load():
+        with pooled_cursor(commit=False) as cur:
+            cur.execute("""
+                SELECT institution, year, core_area, count
+                FROM stats_weekly
+                WHERE week = %s
+                ORDER BY count DESC, institution, year, core_area
+                LIMIT %s
+            """, (week, limit))
+            return _group_df(cur.fetchall(), ("count",))
+
+    return _cache.get(f"top:{week}:{limit}", load)
+
+
+def trending(limit: int = 10) -> pd.DataFrame:
+    """Groups with the largest rise from last week to this week."""
+    this_week = week_start()
+    last_week = this_week - timedelta(days=7)
+
+    def load():
+        with pooled_cursor(commit=False) as cur:
+            # output names can only be used bare in ORDER BY, hence the subquery
+            cur.execute("""
+                SELECT * FROM (
+                    SELECT institution, year, core_area,
+                           COALESCE(SUM(count) FILTER (WHERE week = %(this)s), 0)::bigint AS this_week,
+                           COALESCE(SUM(count) FILTER (WHERE week = %(last)s), 0)::bigint AS last_week
+                    FROM stats_weekly
+                    WHERE week IN (%(this)s, %(last)s)
+                    GROUP BY institution, year, core_area
+                ) w
+                ORDER BY this_week - last_week DESC, this_week DESC, institution, year, core_area
+                LIMIT %(limit)s
+            """, {"this": this_week, "last": last_week, "limit": limit})
+            df = _group_df(cur.fetchall(), ("this_week", "last_week"))
+        df["change"] = df["this_week"] - df["last_week"]
+        return df
+
+    return _cache.get(f"trending:{this_week}:{limit}", load)
+
+
+def trend(days: int = 28, by: str = "core_area", weekly: bool = False) -> pd.DataFrame:
+    """Counts over the last `days` days: one row per day (or week), one column per `by` value."""
+    if by not in GROUP_COLUMNS:
+        raise ValueError(f"trend by {by!r}; expected one of {GROUP_COLUMNS}")
+    table, bucket = ("stats_weekly", "week") if weekly else ("stats_daily", "day")
+    since = today() - timedelta(days=days - 1)
+    if weekly:
+        since = week_start(since)
+
+    def load():
+        with pooled_cursor(commit=False) as cur:
+            cur.execute(f"""
+                SELECT {bucket} AS bucket, {by} AS key, SUM(count)::bigint AS count
+                FROM {table}
+                WHERE {bucket} >= %s
+                GROUP BY 1, 2
+                ORDER BY 1
+            """, (since,))
+            rows = cur.fetchall()
+        df = pd.DataFrame(rows, columns=["bucket", "key", "count"])
+        return df.pivot_table(index="bucket", columns="key", values="count", aggfunc="sum", fill_value=0)
+
+    return _cache.get(f"trend:{table}:{by}:{since}", load)
+
+
+def watermark() -> Dict[str, object]:
+    with pooled_cursor(commit=False) as cur:
+        cur.execute("SELECT last_id, merged_at FROM stats_watermark WHERE id = 1;")
+        return dict(cur.fetchone() or {})
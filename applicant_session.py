@@ -0,0 +1,108 @@
+# applicant_session.py
+import json
+import os
+import re
+import tempfile
+import time
+import uuid
+from typing import Any, Dict, Optional
+import streamlit as st
+from blobstore import get_blob_store
+
+SESSION_DIR = os.getenv("SESSION_DIR", os.path.join(tempfile.gettempdir(), "core-courses-sessions"))
+# the ?s= token is the only key to a session and its uploads; it stops resolving after a day
+SESSION_TTL_SECONDS = float(os.getenv("SESSION_TTL_SECONDS", str(24 * 3600)))
+QUERY_PARAM = "s"
+
+_TOKEN = re.compile(r"^[0-9a-f]{32}$")
+
+
+def _empty() -> Dict[str, Any]:
+    # only course data and upload handles are persisted; personal details stay in the browser session
+    # transcript holds the file_id of the last stored transcript upload (its blob is uploads["transcript_pdf"]);
+    # catalog_items maps str(syllabus id) -> record for the syllabi picked from the catalog
+    return {"manual_items": [], "catalog_items": {}, "uploads": {}, "transcript": None}
+
+
+def _session_path(token: str) -> str:
+    return os.path.join(SESSION_DIR, f"{token}.json")
+
+
+def load_session(token: str) -> Dict[str, Any]:
+    state = _empty()
+    try:
+        with open(_session_path(token), encoding="utf-8") as f:
+            stored = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return state
+    if time.time() - stored.get("saved_at", 0) > SESSION_TTL_SECONDS:
+        try:
+            os.remove(_session_path(token))
+        except FileNotFoundError:
+            pass
+        return state
+    state.update({k: stored[k] for k in state if k in stored})
+    # uploads whose blobs were evicted are dropped rather than exported as broken entries
+    blobs = get_blob_store()
+    state["uploads"] = {k: h for k, h in state["uploads"].items() if blobs.exists(h)}
+    if "transcript_pdf" not in state["uploads"]:
+        state["transcript"] = None
+    return state
+
+
+def save_session(token: str, state: Dict[str, Any]):
+    os.makedirs(SESSION_DIR, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=SESSION_DIR, prefix=".session-")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump({**state, "saved_at": time.time()}, f, ensure_ascii=False, default=str)
+    os.replace(tmp, _session_path(token))
+
+
+def current_session() -> Dict[str, Any]:
+    """The applicant's persisted state, resumed from the `?s=` token in the URL.
+
+    Retention: the state is kept for SESSION_TTL_SECONDS after the last save and
+    uploaded files for BLOB_TTL_SECONDS after their last use (both default one day).
+    """
+    token = st.query_params.get(QUERY_PARAM)
+    if not token or not _TOKEN.match(token):
+        token = uuid.uuid4().hex
+        st.query_params[QUERY_PARAM] = token
+    if st.session_state.get("applicant_token") != token:
+        st.session_state["applicant_token"] = token
+        st.session_state["applicant_state"] = load_session(token)
+    return st.session_state["applicant_state"]
+
+
+def persist_session():
+    save_session(st.session_state["applicant_token"], st.session_state["applicant_state"])
+
+
+def store_upload(uploaded_file, key: Optional[str] = None) -> str:
+    """Put an UploadedFile into the blob store and record its handle in the session under `key`."""
+    state = current_session()
+    uploaded_file.seek(0)
+    handle = get_blob_store().put(uploaded_file)
+    key = key or f"user_pdf_{handle[:12]}_{uploaded_file.name}"
+    state["uploads"][key] = handle
+    persist_session()
+    return key
+
+
+def remove_upload(key: str):
+    """Forget an upload handle; the blob itself stays (it may be shared) until evicted."""
+    state = current_session()
+    if state["uploads"].pop(key, None) is not None:
+        persist_session()
+
+
+def upload_paths(state: Dict[str, Any]) -> Dict[str, str]:
+    """upload key -> blob path; exports stream these files instead of holding their bytes."""
+    blobs = get_blob_store()
+    paths = {}
+    for key, handle in state["uploads"].items():
+        try:
+            paths[key] = blobs.path(handle)
+        except KeyError:
+            continue
+    return paths
@@ -0,0 +1,106 @@
+# benchmarks/bench_memory.py
+# Syllabi frame memory: list of dict rows -> DataFrame (previous loaders) vs chunked columnar build.
+#   python -m benchmarks.bench_memory                       # synthetic 100k rows, no database
+#   BENCH_DATABASE_URL=... python -m benchmarks.bench_memory --db
+import argparse
+import gc
+import time
+import tracemalloc
+
+import pandas as pd
+
+import columnar
+from benchmarks.synthetic import generate_rows
+from columnar import FETCH_CHUNK_ROWS, ColumnBuilder
+from data_access import SYLLABI_COLUMNS
+
+NAMES = [name for name, _ in SYLLABI_COLUMNS]
+
+
+def _driver_rows(n_inst, n_years, n_courses):
+    # a DB driver hands out a fresh str object per value; mimic that so interning does not flatter either path
+    for i, (inst, year, code, name, area, url) in enumerate(generate_rows(n_inst, n_years, n_courses), 1):
+        yield tuple((v + "\0")[:-1] if isinstance(v, str) else v for v in (i, inst, year, code, name, area, url))
+
+
+def build_dicts(n_inst, n_years, n_courses):
+    rows = [dict(zip(NAMES, r)) for r in _driver_rows(n_inst, n_years, n_courses)]
+    return pd.DataFrame(rows)
+
+
+def build_columnar(n_inst, n_years, n_courses):
+    builder = ColumnBuilder(SYLLABI_COLUMNS)
+    chunk = []
+    for row in _driver_rows(n_inst, n_years, n_courses):
+        chunk.append(row)
+        if len(chunk) == FETCH_CHUNK_ROWS:
+            builder.add(chunk)
+            chunk = []
+    builder.add(chunk)
+    return builder.frame()
+
+
+def measure(fn):
+    gc.collect()
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    df = fn()
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return df, peak, elapsed
+
+
+def _db_paths(args):
+    from benchmarks.harness import use_benchmark_database
+    use_benchmark_database()
+    from schema import ensure_db_ready
+    from benchmarks.synthetic import load_catalog
+    from data_access import SYLLABI_SQL, _load_syllabi_df
+    from db import pooled_cursor
+    ensure_db_ready()
+    load_catalog(args.institutions, args.years, args.courses)
+
+    def legacy():
+        with pooled_cursor(commit=False) as cur:
+            cur.execute(SYLLABI_SQL)
+            rows = cur.fetchall()
+        return pd.DataFrame(rows)
+
+    return [("RealDictCursor + DataFrame", legacy), ("server-side columnar", _load_syllabi_df)]
+
+
+def main():
+    ap = argparse.ArgumentParser(description="syllabi frame memory benchmark")
+    ap.add_argument("--institutions", type=int, default=50)
+    ap.add_argument("--years", type=int, default=10)
+    ap.add_argument("--courses", type=int, default=200, help="courses per institution per year")
+    ap.add_argument("--db", action="store_true", help="load through the real loaders from BENCH_DATABASE_URL")
+    args = ap.parse_args()
+    dims = (args.institutions, args.years, args.courses)
+
+    if args.db:
+        paths = _db_paths(args)
+    else:
+        paths = [("dict rows + DataFrame", lambda: build_dicts(*dims)),
+                 ("columnar", lambda: build_columnar(*dims))]
+
+    print(f"{args.institutions * args.years * args.courses} rows")
+    print(f"{'path':<30}{'strings':>10}{'frame MB':>10}{'peak MB':>10}{'seconds':>10}")
+    for name, fn in paths:
+        for arrow in (False, True):
+            if arrow and name.startswith(("dict", "RealDict")):
+                continue
+            columnar.ARROW_STRINGS = arrow
+            if arrow and columnar.string_dtype() is object:
+                print(f"{name:<30}{'arrow':>10}  skipped (pyarrow not installed)")
+                continue
+            df, peak, elapsed = measure(fn)
+            size = df.memory_usage(deep=True).sum()
+            print(f"{name:<30}{'arrow' if arrow else 'object':>10}{size / 2**20:>10.1f}"
+                  f"{peak / 2**20:>10.1f}{elapsed:>10.2f}")
+            del df
+
+
+if __name__ == "__main__":
+    main()
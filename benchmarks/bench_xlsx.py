@@ -0,0 +1,96 @@
+# benchmarks/bench_xlsx.py
+# Faculty table rendering: pandas+openpyxl (previous export path) vs utils.xlsx.
+#   python -m benchmarks.bench_xlsx --rows 20 --rows 500 --repeat 50
+import argparse, io, subprocess, sys, time
+
+from utils.export import make_faculty_table_rows
+from utils.xlsx import faculty_table, render_table
+
+FACULTY = {
+    "id": "bgu",
+    "table_fields": [
+        {"id": "applicant_full_name", "label": "שם מלא"},
+        {"id": "id_or_passport", "label": "ת.ז/דרכון"},
+        {"id": "institution", "label": "מוסד לימוד"},
+        {"id": "year", "label": "שנה"},
+        {"id": "course_code", "label": "מס' קורס"},
+        {"id": "course_name", "label": "שם הקורס"},
+        {"id": "core_area", "label": "תחום ליבה"},
+        {"id": "grade", "label": "ציון"},
+    ],
+}
+APPLICANT = {"full_name": "ישראל ישראלי", "id_or_passport": "123456789"}
+
+
+def make_selections(n):
+    return [{
+        "institution": f"מוסד {i % 7}", "year": 2015 + i % 10, "course_code": f"C-{i:05d}",
+        "course_name": f"קורס מספר {i}", "core_area": "כימיה כללית", "grade": str(60 + i % 40),
+    } for i in range(n)]
+
+
+def render_pandas(rows):
+    import pandas as pd
+    df = pd.DataFrame(rows)
+    cols_order = [fld["id"] for fld in FACULTY["table_fields"] if fld["id"] in df.columns]
+    df = df[cols_order].rename(columns={fld["id"]: fld["label"] for fld in FACULTY["table_fields"]})
+    buf = io.BytesIO()
+    with pd.ExcelWriter(buf, engine="openpyxl") as writer:
+        df.to_excel(writer, index=False, sheet_name="קורסי ליבה")
+    return buf.getvalue()
+
+
+def render_fast(rows, fmt="xlsx"):
+    headers, values = faculty_table(FACULTY, rows)
+    return render_table(headers, values, fmt=fmt)
+
+
+def timeit(fn, repeat):
+    fn()  # warm-up
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    samples.sort()
+    return samples[len(samples) // 2], samples[int(len(samples) * 0.95) - 1 if len(samples) > 1 else 0]
+
+
+def import_time(module):
+    t0 = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-c", f"import {module}"], capture_output=True)
+    return time.perf_counter() - t0 if proc.returncode == 0 else float("nan")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="faculty table rendering micro-benchmark")
+    ap.add_argument("--rows", type=int, action="append", help="rows per table (repeatable)")
+    ap.add_argument("--repeat", type=int, default=30)
+    args = ap.parse_args()
+
+    print(f"{'import':<28}{'seconds':>10}")
+    for module in ("pandas, openpyxl", "utils.xlsx"):
+        print(f"{module:<28}{import_time(module):>10.3f}")
+    print()
+
+    print(f"{'rows':>6} {'path':<16}{'p50 ms':>10}{'p95 ms':>10}{'bytes':>10}")
+    for n in args.rows or [20, 500]:
+        rows = make_faculty_table_rows(APPLICANT, make_selections(n))
+        paths = [
+            ("pandas+openpyxl", lambda: render_pandas(rows)),
+            ("utils.xlsx", lambda: render_fast(rows)),
+            ("utils.xlsx ods", lambda: render_fast(rows, "ods")),
+            ("utils.xlsx csv", lambda: render_fast(rows, "csv")),
+        ]
+        for name, fn in paths:
+            try:
+                p50, p95 = timeit(fn, args.repeat)
+                size = len(fn())
+            except ImportError as e:
+                print(f"{n:>6} {name:<16}  skipped ({e})")
+                continue
+            print(f"{n:>6} {name:<16}{p50 * 1e3:>10.2f}{p95 * 1e3:>10.2f}{size:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+# benchmarks/flow.py
+# Headless applicant walk through steps 1-6 of streamlit_app.py via AppTest.
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List
+
+from benchmarks.harness import QUERIES, summarize
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "streamlit_app.py")
+
+
+def _by_label(widgets, label):
+    for w in widgets:
+        if w.label == label:
+            return w
+    raise LookupError(f"no widget labelled {label!r}")
+
+
+class ApplicantRun:
+    """One simulated applicant; every AppTest.run() is one rerun and is timed."""
+
+    def __init__(self, applicant_no: int, courses: int, faculties: int, timeout: float = 60):
+        from streamlit.testing.v1 import AppTest
+        self.at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+        self.no = applicant_no
+        self.courses = courses
+        self.faculties = faculties
+        self.reruns: List[Dict[str, Any]] = []
+
+    def _run(self, step: str):
+        with QUERIES.measure() as q:
+            t0 = time.perf_counter()
+            self.at.run()
+            elapsed = time.perf_counter() - t0
+        if self.at.exception:
+            raise RuntimeError(f"applicant {self.no}, {step}: {self.at.exception[0].value}")
+        self.reruns.append({"step": step, "seconds": elapsed, "queries": q["queries"]})
+
+    def walk(self) -> List[Dict[str, Any]]:
+        at = self.at
+        self._run("load")
+
+        # step 1 – personal details (one rerun per field, as in the browser)
+        for label, value in (("שם מלא", f"מועמד {self.no}"), ("ת.ז/דרכון", f"{100000000 + self.no}"),
+                             ('דוא"ל', f"applicant{self.no}@example.com")):
+            _by_label(at.text_input, label).input(value)
+            self._run("step1")
+
+        # step 2 – institution, year, courses
+        inst = _by_label(at.selectbox, "בחר/י מוסד")
+        inst.select(inst.options[1 + self.no % (len(inst.options) - 1)])
+        self._run("step2-institution")
+        year = _by_label(at.selectbox, "בחר/י שנה")
+        year.select(year.options[0])
+        self._run("step2-year")
+        picker = _by_label(at.multiselect, "בחר/י קורסים להוספה")
+        seen = at.session_state["seen_syllabi"]
+        for sid in list(seen)[:self.courses]:
+            picker.select(sid)
+        self._run("step2-courses")
+
+        # step 4 – faculties
+        for box in [b for b in at.checkbox if b.label != "אני מסכים/ה לשימוש אנונימי לסטטיסטיקות מצטברות"][:self.faculties]:
+            box.check()
+            self._run("step4")
+
+        # step 5 – export; the build runs in the background, so rerun until it is ready
+        _by_label(at.button, "יצירת ZIP לכל הפקולטות שנבחרו").click()
+        self._run("step5-export")
+        deadline = time.monotonic() + 60
+        while not any("ניתן להוריד" in s.value for s in at.success) and time.monotonic() < deadline:
+            time.sleep(0.2)
+            self._run("step5-poll")
+        return self.reruns
+
+
+def _worker_init(courses: int, faculties: int):
+    from benchmarks.harness import use_benchmark_database
+    use_benchmark_database()
+    QUERIES.install()
+    ApplicantRun(0, courses, faculties).walk()  # warm this process's caches and pool
+
+
+def _worker_ready(_):
+    time.sleep(0.5)  # long enough for every worker to be started and take one
+
+
+def _walk(n: int, courses: int, faculties: int) -> List[Dict[str, Any]]:
+    return ApplicantRun(n, courses, faculties).walk()
+
+
+def run_flow(applicants: int, concurrency: int, courses: int, faculties: int) -> Dict[str, Any]:
+    # a single warm-up walk so cold-start cost is not mixed into the concurrent numbers
+    profile = ApplicantRun(0, courses, faculties).walk()
+
+    # AppTest swaps the global streamlit Runtime on every run, so concurrent walks need their own
+    # processes; spawned, not forked, so no pooled connection or writer thread is inherited
+    with ProcessPoolExecutor(max_workers=concurrency, mp_context=multiprocessing.get_context("spawn"),
+                             initializer=_worker_init, initargs=(courses, faculties)) as pool:
+        list(pool.map(_worker_ready, range(concurrency)))
+        t0 = time.perf_counter()
+        walks = list(pool.map(_walk, range(1, applicants + 1), [courses] * applicants, [faculties] * applicants))
+        wall = time.perf_counter() - t0
+
+    reruns = [r for walk in walks for r in walk]
+    by_step: Dict[str, List[float]] = {}
+    for r in reruns:
+        by_step.setdefault(r["step"], []).append(r["seconds"])
+    return {
+        "applicants": applicants,
+        "concurrency": concurrency,
+        "wall_seconds": wall,
+        "reruns": len(reruns),
+        "rerun_latency": summarize([r["seconds"] for r in reruns]),
+        "rerun_latency_by_step": {step: summarize(v) for step, v in sorted(by_step.items())},
+        # attributed exactly only in the sequential warm-up walk; workers count their own statements
+        "queries_per_rerun_by_step": {r["step"]: r["queries"] for r in profile},
+        "queries_per_rerun_concurrent": sum(r["queries"] for r in reruns) / len(reruns) if reruns else 0.0,
+    }
@@ -0,0 +1,46 @@
+# benchmarks/micro.py
+# Micro-benchmarks of the data access and export hot paths against the benchmark database.
+import os
+from typing import Any, Dict
+
+from benchmarks.harness import bench
+
+
+def _sample_applicant_input(n_courses: int, n_faculties: int, pdf_bytes: int = 256 * 1024):
+    from data_access import fetch_faculties, fetch_syllabi_df
+    faculties, lookup = fetch_faculties()
+    df = fetch_syllabi_df().head(n_courses)
+    selections = [{**r, "uploaded_file_key": None} for r in df.to_dict("records")]
+    uploads = {}
+    for i, sel in enumerate(selections[::3]):
+        key = f"user_pdf_{i}"
+        sel["uploaded_file_key"] = key
+        uploads[key] = os.urandom(pdf_bytes)
+    applicant = {"full_name": "מועמד בדיקה", "id_or_passport": "000000000", "email": "a@example.com", "phone": ""}
+    return applicant, selections, [f["id"] for f in faculties[:n_faculties]], uploads, lookup
+
+
+def run_micro(repeat: int, courses: int, faculties: int) -> Dict[str, Any]:
+    import data_access
+    from data_access import (fetch_syllabi_df, fetch_stats_agg_df, course_is_fresh, fetch_faculties,
+                             invalidate_reference_cache)
+    from utils.export import export_faculty_packages
+
+    results: Dict[str, Any] = {}
+    results["fetch_syllabi_df.uncached"] = bench(data_access._load_syllabi_df, repeat)
+    invalidate_reference_cache()
+    results["fetch_syllabi_df.cached"] = bench(fetch_syllabi_df, repeat * 10)
+
+    faculty_ids = [f["id"] for f in fetch_faculties()[0]]
+    results["course_is_fresh"] = bench(
+        lambda: [course_is_fresh(year, fid) for year in range(2000, 2030) for fid in faculty_ids], repeat * 10)
+
+    results["fetch_stats_agg_df.uncached"] = bench(data_access._load_stats_agg_df, repeat)
+    results["fetch_stats_agg_df.cached"] = bench(fetch_stats_agg_df, repeat * 10)
+
+    applicant, selections, chosen, uploads, lookup = _sample_applicant_input(courses, faculties)
+    results["export_faculty_packages"] = {
+        **bench(lambda: export_faculty_packages(applicant, selections, chosen, uploads, lookup), repeat),
+        "courses": len(selections), "faculties": len(chosen), "uploads": len(uploads),
+    }
+    return results
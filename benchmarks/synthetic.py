@@ -0,0 +1,69 @@
+# benchmarks/synthetic.py
+# Synthetic syllabus catalogs: N institutions x M years x K courses.
+import csv
+import io
+import random
+from typing import Iterator, List, Tuple
+
+CORE_AREAS = ["כימיה כללית", "כימיה אורגנית", "ביוכימיה", "ביולוגיה של התא",
+              "מיקרוביולוגיה", "פיזיקה", "סטטיסטיקה"]
+INSTITUTION_KINDS = ["מכללת", "מכינת אונ'", "אוניברסיטת", "המרכז האקדמי"]
+COURSE_WORDS = ["מבוא ל", "יסודות ה", "מתקדם: ", "סדנה ב", "מעבדה ב"]
+
+Row = Tuple[str, int, str, str, str, str]
+
+
+def institutions(n: int) -> List[str]:
+    return [f"{INSTITUTION_KINDS[i % len(INSTITUTION_KINDS)]} {i:03d}" for i in range(n)]
+
+
+def generate_rows(n_institutions: int, n_years: int, n_courses: int, first_year: int = 2014,
+                  seed: int = 0) -> Iterator[Row]:
+    """(institution, year, course_code, course_name, core_area, file_url), deterministic for a seed."""
+    rnd = random.Random(seed)
+    for i, inst in enumerate(institutions(n_institutions)):
+        for year in range(first_year, first_year + n_years):
+            for k in range(n_courses):
+                area = CORE_AREAS[(i + k) % len(CORE_AREAS)]
+                code = f"I{i:03d}-{k:04d}"
+                name = f"{rnd.choice(COURSE_WORDS)}{area} {k}"
+                yield inst, year, code, name, area, f"https://example.com/{i}/{year}/{code}.pdf"
+
+
+def load_catalog(n_institutions: int, n_years: int, n_courses: int, seed: int = 0, chunk: int = 20_000) -> int:
+    """Replace `syllabi` in the benchmark database with a synthetic catalog via COPY."""
+    from db import pooled_cursor
+    with pooled_cursor() as cur:
+        cur.execute("TRUNCATE stats, stats_rollup, stats_daily, stats_weekly RESTART IDENTITY;")
+        cur.execute("UPDATE stats_watermark SET last_id = 0, merged_at = NULL WHERE id = 1;")
+        cur.execute("DELETE FROM syllabi;")
+        cur.executemany("INSERT INTO core_areas (name) VALUES (%s) ON CONFLICT DO NOTHING", [(a,) for a in CORE_AREAS])
+
+    total, buf = 0, io.StringIO()
+    writer = csv.writer(buf)
+
+    def flush():
+        buf.seek(0)
+        with pooled_cursor() as cur:
+            cur.copy_expert("COPY syllabi (institution, year, course_code, course_name, core_area, file_url) "
+                            "FROM STDIN WITH (FORMAT csv)", buf)
+        buf.seek(0)
+        buf.truncate()
+
+    for row in generate_rows(n_institutions, n_years, n_courses, seed=seed):
+        writer.writerow(row)
+        total += 1
+        if total % chunk == 0:
+            flush()
+    flush()
+    with pooled_cursor() as cur:
+        cur.execute("ANALYZE syllabi;")
+    return total
+
+
+def write_csv(path: str, n_institutions: int, n_years: int, n_courses: int, seed: int = 0):
+    """Same catalog as a CSV file, for exercising import_catalog.py."""
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["institution", "year", "course_code", "course_name", "core_area", "file_url"])
+        writer.writerows(generate_rows(n_institutions, n_years, n_courses, seed=seed))
@@ -0,0 +1,191 @@
+# blobstore.py
+import hashlib
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+from typing import BinaryIO, Iterator, Optional, Tuple, Union
+
+BLOB_STORE_DIR = os.getenv("BLOB_STORE_DIR", os.path.join(tempfile.gettempdir(), "core-courses-blobs"))
+BLOB_MAX_BYTES = int(os.getenv("BLOB_MAX_BYTES", str(20 * 1024 * 1024)))
+BLOB_STORE_MAX_BYTES = int(os.getenv("BLOB_STORE_MAX_BYTES", str(2 * 1024 * 1024 * 1024)))
+# uploads (syllabi, transcripts) are personal documents: dropped after a day without use
+BLOB_TTL_SECONDS = float(os.getenv("BLOB_TTL_SECONDS", str(24 * 3600)))
+BLOB_EVICT_INTERVAL = float(os.getenv("BLOB_EVICT_INTERVAL", "60"))
+
+log = logging.getLogger(__name__)
+
+_HANDLE = re.compile(r"^[0-9a-f]{64}$")
+_CHUNK = 1024 * 1024
+
+
+class BlobTooLarge(ValueError):
+    pass
+
+
+class BlobStore:
+    """Content-addressed, size-bounded blob store on local disk.
+
+    A handle is the SHA-256 of the content, so identical uploads are stored
+    once. Access refreshes a blob's mtime; eviction drops blobs untouched for
+    `ttl` seconds, then least-recently-used ones until the store fits `max_total`.
+
+    Retention: a blob is deleted once unused for `ttl` seconds (BLOB_TTL_SECONDS,
+    default one day). A daemon thread evicts every `evict_interval` seconds, and
+    expired blobs are treated as gone even before the sweep reaches them.
+    """
+
+    def __init__(self, root: str = BLOB_STORE_DIR, max_blob: int = BLOB_MAX_BYTES,
+                 max_total: int = BLOB_STORE_MAX_BYTES, ttl: float = BLOB_TTL_SECONDS,
+                 evict_interval: float = BLOB_EVICT_INTERVAL):
+        self.root = root
+        self.max_blob = max_blob
+        self.max_total = max_total
+        self.ttl = ttl
+        self.evict_interval = evict_interval
+        self._lock = threading.Lock()
+        self._last_evict = 0.0
+        self._stop = threading.Event()
+        os.makedirs(self.root, exist_ok=True)
+        if evict_interval > 0:
+            threading.Thread(target=self._sweep, name="blob-evict", daemon=True).start()
+
+    def _path(self, handle: str) -> str:
+        if not _HANDLE.match(handle or ""):
+            raise KeyError(handle)
+        return os.path.join(self.root, handle[:2], handle)
+
+    def put(self, data: Union[bytes, bytearray, memoryview, BinaryIO]) -> str:
+        chunks = _iter_chunks(data)
+        digest = hashlib.sha256()
+        size = 0
+        fd, tmp = tempfile.mkstemp(dir=self.root, prefix=".incoming-")
+        try:
+            with os.fdopen(fd, "wb") as out:
+                for chunk in chunks:
+                    size += len(chunk)
+                    if size > self.max_blob:
+                        raise BlobTooLarge(f"blob exceeds {self.max_blob} bytes")
+                    digest.update(chunk)
+                    out.write(chunk)
+            handle = digest.hexdigest()
+            path = self._path(handle)
+            if os.path.exists(path):
+                os.utime(path)
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.replace(tmp, path)
+                tmp = None
+        finally:
+            if tmp is not None and os.path.exists(tmp):
+                os.remove(tmp)
+        self.maybe_evict(keep=path)
+        return handle
+
+    def _expired(self, path: str) -> bool:
+        return time.time() - os.stat(path).st_mtime > self.ttl
+
+    def exists(self, handle: str) -> bool:
+        try:
+            return not self._expired(self._path(handle))
+        except (KeyError, FileNotFoundError):
+            return False
+
+    def path(self, handle: str) -> str:
+        """Filesystem path of a blob, for readers that can stream or mmap it directly."""
+        path = self._path(handle)
+        try:
+            if self._expired(path):
+                raise FileNotFoundError(path)
+            os.utime(path)
+        except FileNotFoundError:
+            raise KeyError(handle) from None
+        return path
+
+    def open(self, handle: str) -> BinaryIO:
+        return open(self.path(handle), "rb")
+
+    def read(self, handle: str) -> bytes:
+        with self.open(handle) as f:
+            return f.read()
+
+    def _entries(self) -> Iterator[Tuple[str, float, int]]:
+        for shard in os.scandir(self.root):
+            if len(shard.name) != 2 or not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                try:
+                    st = entry.stat()
+                except FileNotFoundError:
+                    continue
+                yield entry.path, st.st_mtime, st.st_size
+
+    def maybe_evict(self, keep: Optional[str] = None):
+        if time.monotonic() - self._last_evict >= self.evict_interval:
+            self.evict(keep)
+
+    def evict(self, keep: Optional[str] = None) -> int:
+        with self._lock:
+            self._last_evict = time.monotonic()
+            now = time.time()
+            removed = 0
+            live = []
+            for path, mtime, size in self._entries():
+                if path == keep:
+                    continue
+                if now - mtime > self.ttl:
+                    removed += _remove(path)
+                else:
+                    live.append((mtime, size, path))
+            total = sum(size for _, size, _ in live)
+            for mtime, size, path in sorted(live):
+                if total <= self.max_total:
+                    break
+                removed += _remove(path)
+                total -= size
+            return removed
+
+    def _sweep(self):
+        while not self._stop.wait(self.evict_interval):
+            try:
+                self.evict()
+            except Exception:
+                log.exception("blob eviction failed")
+
+    def shutdown(self):
+        self._stop.set()
+
+
+def _remove(path: str) -> int:
+    try:
+        os.remove(path)
+        return 1
+    except FileNotFoundError:
+        return 0
+
+
+def _iter_chunks(data) -> Iterator[bytes]:
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        view = memoryview(data)
+        for start in range(0, len(view), _CHUNK):
+            yield view[start:start + _CHUNK]
+        return
+    while True:
+        chunk = data.read(_CHUNK)
+        if not chunk:
+            return
+        yield chunk
+
+
+_store: Optional[BlobStore] = None
+_store_lock = threading.Lock()
+
+
+def get_blob_store() -> BlobStore:
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = BlobStore()
+        return _store
@@ -0,0 +1,94 @@
+# catalog.py
+import bisect
+import difflib
+import re
+import unicodedata
+from typing import Any, Dict
+import pandas as pd
+
+_MAQAF = "\u05be"
+_NIQQUD = re.compile("[\u0591-\u05c7]")
+_FINALS = str.maketrans("ךםןףץ", "כמנפצ")
+_PUNCT = re.compile(r"[\"'`׳״\-–—_.,:;()\[\]/\\+]+")
+
+COLUMNS = ["id", "institution", "year", "course_code", "course_name", "core_area", "file_url"]
+
+
+def normalize(text: Any) -> str:
+    """Hebrew-aware search key: no niqqud/cantillation, final letters folded, no punctuation."""
+    text = unicodedata.normalize("NFKC", "" if text is None else str(text))
+    text = text.replace(_MAQAF, " ")
+    text = _NIQQUD.sub("", text).translate(_FINALS).lower()
+    return " ".join(_PUNCT.sub(" ", text).split())
+
+
+def _row_tokens(course_name: Any, course_code: Any) -> set:
+    # Arrow-backed strings (ARROW_STRINGS=1) hold missing values as pd.NA, which str() renders as "<NA>"
+    tokens = set() if pd.isna(course_name) else set(normalize(course_name).split())
+    code = "" if pd.isna(course_code) else normalize(course_code)
+    if code:
+        tokens.update(code.split())
+        tokens.add(code.replace(" ", ""))  # "HAD-CH101" is also found as "hadch101"
+    return tokens
+
+
+class SyllabusCatalog:
+    """Immutable in-memory search index over the syllabi, built once per data version.
+
+    Rows are sorted by (institution, year DESC, course_name); step 2 browses
+    institution/year pages straight from the database, so only search is served here.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        df = df.reindex(columns=COLUMNS) if df.empty else df
+        df = df.sort_values(["institution", "year", "course_name"], ascending=[True, False, True],
+                            kind="stable").reset_index(drop=True)
+        df["institution"] = df["institution"].astype("category")
+        df["core_area"] = df["core_area"].astype("category")
+        self.df = df
+
+        postings = sorted(
+            (token, pos)
+            for pos, (name, code) in enumerate(zip(df["course_name"], df["course_code"]))
+            for token in _row_tokens(name, code)
+        )
+        self._tokens = [t for t, _ in postings]
+        self._token_rows = [p for _, p in postings]
+        self._vocab = sorted(set(self._tokens))
+
+    def __len__(self) -> int:
+        return len(self.df)
+
+    def _prefix_rows(self, term: str) -> set:
+        lo = bisect.bisect_left(self._tokens, term)
+        hi = bisect.bisect_left(self._tokens, term + "\uffff")
+        return set(self._token_rows[lo:hi])
+
+    def _fuzzy_rows(self, term: str) -> set:
+        rows = set()
+        for token in difflib.get_close_matches(term, self._vocab, n=5, cutoff=0.75):
+            rows |= self._prefix_rows(token)
+        return rows
+
+    def search(self, query: str, limit: int = 50) -> pd.DataFrame:
+        """Course name/code search across all institutions.
+
+        Every query term must prefix-match a token of the row; when nothing
+        matches, terms fall back to close (typo-tolerant) token matches.
+        """
+        terms = normalize(query).split()
+        if not terms:
+            return self.df.iloc[0:0]
+        hits = None
+        for term in terms:
+            rows = self._prefix_rows(term)
+            hits = rows if hits is None else hits & rows
+        if not hits:
+            scores: Dict[int, int] = {}
+            for term in terms:
+                for pos in self._fuzzy_rows(term):
+                    scores[pos] = scores.get(pos, 0) + 1
+            hits = sorted(scores, key=lambda pos: (-scores[pos], pos))
+        else:
+            hits = sorted(hits)
+        return self.df.iloc[hits[:limit]]
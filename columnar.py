@@ -0,0 +1,100 @@
+# columnar.py
+# Typed DataFrames built straight from tuple rows, chunk by chunk, without a dict per row.
+import os
+from array import array
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+# "1" stores text columns as Arrow-backed strings when pyarrow is installed
+ARROW_STRINGS = os.getenv("ARROW_STRINGS", "0") == "1"
+FETCH_CHUNK_ROWS = int(os.getenv("FETCH_CHUNK_ROWS", "5000"))
+
+# (column name, dtype); dtype is "category", "string" or a NOT NULL integer type
+ColumnSpec = Sequence[Tuple[str, str]]
+
+_INT_TYPECODES = {"int16": "h", "int32": "i", "int64": "q"}
+
+
+def string_dtype():
+    if ARROW_STRINGS:
+        try:
+            import pyarrow  # noqa: F401
+            return "string[pyarrow]"
+        except ImportError:
+            pass
+    return object
+
+
+class ColumnBuilder:
+    """Accumulates tuple rows into per-column buffers.
+
+    Integers go into `array` buffers, category columns into int32 codes plus a
+    value -> code dict (so each distinct string is kept once), and text columns
+    into plain lists. `frame()` wraps the buffers without going through rows.
+    """
+
+    def __init__(self, spec: ColumnSpec):
+        self.spec = list(spec)
+        self.rows = 0
+        self._buffers: List[Any] = []
+        self._codes: Dict[int, Dict[Any, int]] = {}
+        for i, (_, dtype) in enumerate(self.spec):
+            if dtype == "category":
+                self._buffers.append(array("i"))
+                self._codes[i] = {}
+            elif dtype in _INT_TYPECODES:
+                self._buffers.append(array(_INT_TYPECODES[dtype]))
+            elif dtype == "string":
+                self._buffers.append([])
+            else:
+                raise ValueError(f"unsupported column dtype {dtype!r}")
+
+    def add(self, rows: Sequence[Sequence[Any]]):
+        if not rows:
+            return
+        for i, values in enumerate(zip(*rows)):
+            codes = self._codes.get(i)
+            if codes is None:
+                self._buffers[i].extend(values)
+            else:
+                buf = self._buffers[i]
+                for v in values:
+                    if v is None:
+                        buf.append(-1)
+                        continue
+                    code = codes.get(v)
+                    if code is None:
+                        code = codes[v] = len(codes)
+                    buf.append(code)
+        self.rows += len(rows)
+
+    def frame(self) -> pd.DataFrame:
+        data = {}
+        text = string_dtype()
+        for i, (name, dtype) in enumerate(self.spec):
+            buf = self._buffers[i]
+            if dtype == "category":
+                codes = np.frombuffer(buf, dtype=np.int32) if self.rows else np.empty(0, np.int32)
+                data[name] = pd.Categorical.from_codes(codes, categories=list(self._codes[i]))
+            elif dtype in _INT_TYPECODES:
+                data[name] = np.frombuffer(buf, dtype=dtype) if self.rows else np.empty(0, dtype)
+            else:
+                data[name] = pd.array(buf, dtype=text) if text != object else pd.Series(buf, dtype=object)
+        return pd.DataFrame(data)
+
+
+def frame_from_chunks(chunks: Iterable[Sequence[Sequence[Any]]], spec: ColumnSpec) -> pd.DataFrame:
+    builder = ColumnBuilder(spec)
+    for rows in chunks:
+        builder.add(rows)
+    return builder.frame()
+
+
+def fetch_chunks(cur, size: int = FETCH_CHUNK_ROWS):
+    while True:
+        rows = cur.fetchmany(size)
+        if not rows:
+            return
+        yield rows
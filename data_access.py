@@ -1,70 +1,528 @@
 # data_access.py
+import os
+import threading
+import time
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
 import pandas as pd
-from typing import List, Dict, Any, Tuple
-from db import pooled_cursor
+from psycopg2.extras import execute_values
+from typing import List, Dict, Any, Tuple, Callable, Optional, NamedTuple
+from db import pooled_cursor, DatabaseUnavailable, DB_UNAVAILABLE_ERRORS
+from pool import PoolTimeout
+from schema import STATS_MERGE_LOCK_ID
+from catalog import SyllabusCatalog
+from columnar import ColumnSpec, fetch_chunks, frame_from_chunks
+
+REFERENCE_CACHE_TTL = float(os.getenv("REFERENCE_CACHE_TTL", "300"))
+STATS_CACHE_TTL = float(os.getenv("STATS_CACHE_TTL", "30"))
+SYLLABI_PAGE_SIZE = int(os.getenv("SYLLABI_PAGE_SIZE", "50"))
+# "sync" (psycopg2 pool) or "async" (psycopg 3 async pool, see data_access_async.py)
+DATA_ACCESS_BACKEND = os.getenv("DATA_ACCESS_BACKEND", "sync")
+# reads slower than this are cancelled (statement_timeout / pool wait) and served from the snapshot
+DB_LATENCY_BUDGET = float(os.getenv("DB_LATENCY_BUDGET", "2"))
+DB_BULK_LATENCY_BUDGET = float(os.getenv("DB_BULK_LATENCY_BUDGET", "30"))
+DB_BREAKER_FAILURES = int(os.getenv("DB_BREAKER_FAILURES", "3"))
+DB_BREAKER_RESET_AFTER = float(os.getenv("DB_BREAKER_RESET_AFTER", "30"))
+
+# (institution, year, course_name, id) of the last row of a page
+SyllabiCursor = Tuple[str, int, str, int]
+
+
+class CircuitBreaker:
+    """Stops calling the DB after `failures` consecutive unavailability errors.
+
+    While open, calls fail fast with DatabaseUnavailable; after `reset_after`
+    seconds one trial call is let through and its outcome closes or reopens it.
+    Only `call` should be used to guard DB work: it settles every trial it takes.
+    A PoolTimeout (no free local connection) is not counted: it says the pool is
+    saturated, not that the database is down.
+    """
+
+    def __init__(self, failures: int = DB_BREAKER_FAILURES, reset_after: float = DB_BREAKER_RESET_AFTER):
+        self.failures = failures
+        self.reset_after = reset_after
+        self._lock = threading.Lock()
+        self._consecutive = 0
+        self._opened_at: Optional[float] = None
+        self._trial_at: Optional[float] = None
+        self.trips = 0
+
+    @property
+    def is_open(self) -> bool:
+        with self._lock:
+            return self._opened_at is not None
+
+    def _take_trial(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            now = time.monotonic()
+            # a trial that never reported back (hung caller) is replaced after another reset_after
+            trial_free = self._trial_at is None or now - self._trial_at >= self.reset_after
+            if trial_free and now - self._opened_at >= self.reset_after:
+                self._trial_at = now
+                return True
+            return False
+
+    def _success(self):
+        with self._lock:
+            self._consecutive = 0
+            self._opened_at = None
+            self._trial_at = None
+
+    def _failure(self):
+        with self._lock:
+            self._consecutive += 1
+            if self._trial_at is not None or (self._opened_at is None and self._consecutive >= self.failures):
+                self.trips += self._opened_at is None
+                self._opened_at = time.monotonic()
+            self._trial_at = None
+
+    def _release(self):
+        # fn failed for a reason that says nothing about the DB: free the trial, keep the state
+        with self._lock:
+            self._trial_at = None
+
+    def call(self, fn: Callable[[], Any]) -> Any:
+        if not self._take_trial():
+            raise DatabaseUnavailable("database circuit breaker is open")
+        try:
+            value = fn()
+        except PoolTimeout:
+            self._release()
+            raise
+        except DB_UNAVAILABLE_ERRORS:
+            self._failure()
+            raise
+        except BaseException:
+            self._release()
+            raise
+        self._success()
+        return value
+
+
+DB_BREAKER = CircuitBreaker()
+
+
+class Degraded(NamedTuple):
+    """Loader result served from the local snapshot rather than the DB."""
+    value: Any
+
+
+class ReferenceCache:
+    """Process-wide cache for reference data, shared by all sessions.
+
+    An entry is served without touching the DB until its TTL runs out. After
+    that the single `data_version` row is read: if the version is unchanged the
+    entry is renewed, otherwise it is reloaded. Writers bump the version through
+    triggers (see schema.py), and `invalidate()` drops entries explicitly.
+
+    When the DB is unavailable, expired entries keep being served; a loader may
+    return `Degraded(value)` (snapshot data), which is kept only briefly and
+    without a version, so it is replaced as soon as the DB answers again.
+    """
+
+    def __init__(self, ttl: float, version_fn: Optional[Callable[[], int]] = None,
+                 max_entries: Optional[int] = None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._version_fn = version_fn
+        self._lock = threading.Lock()
+        self._load_locks: Dict[str, threading.Lock] = {}
+        self._entries: "OrderedDict[str, list]" = OrderedDict()  # key -> [value, version, expires_at]
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+
+    def get(self, key: str, loader: Callable[[], Any]) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] > time.monotonic():
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return entry[0]
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        # one loader per key; concurrent sessions wait and reuse its result
+        with load_lock:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and entry[2] > time.monotonic():
+                    self.hits += 1
+                    return entry[0]
+                generation = self._generation
+
+            ttl = None
+            try:
+                version = self._version_fn() if self._version_fn else None
+            except DB_UNAVAILABLE_ERRORS:
+                if entry is not None:
+                    with self._lock:
+                        entry[2] = time.monotonic() + min(self.ttl, DB_BREAKER_RESET_AFTER)
+                        self.hits += 1
+                    return entry[0]
+                # e.g. the catalog built from a snapshot frame: unversioned, kept only briefly
+                version, ttl = None, min(self.ttl, DB_BREAKER_RESET_AFTER)
+            if entry is not None and version is not None and entry[1] == version:
+                with self._lock:
+                    entry[2] = time.monotonic() + self.ttl
+                    self.hits += 1
+                    self.revalidations += 1
+                return entry[0]
+
+            with self._lock:
+                self.misses += 1
+            value = loader()
+            if isinstance(value, Degraded):
+                value, version, ttl = value.value, None, min(self.ttl, DB_BREAKER_RESET_AFTER)
+            with self._lock:
+                if generation == self._generation:
+                    self._store(key, value, version, ttl)
+            return value
+
+    def _store(self, key: str, value: Any, version: Optional[int], ttl: Optional[float] = None):
+        self._entries[key] = [value, version, time.monotonic() + (self.ttl if ttl is None else ttl)]
+        self._entries.move_to_end(key)
+        while self.max_entries and len(self._entries) > self.max_entries:
+            evicted, _ = self._entries.popitem(last=False)
+            self._load_locks.pop(evicted, None)
+
+    def contains(self, key: str) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    @property
+    def generation(self) -> int:
+        with self._lock:
+            return self._generation
+
+    def prime(self, key: str, value: Any, version: Optional[int] = None, generation: Optional[int] = None) -> bool:
+        """Store a value loaded outside `get` (e.g. by a batched loader) as of `version`.
+
+        Pass the `generation` read before the load started: if the cache was
+        invalidated meanwhile the value may be stale and is not stored.
+        """
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return False
+            self._store(key, value, version)
+            return True
+
+    def invalidate(self, key: Optional[str] = None):
+        with self._lock:
+            self._generation += 1
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "hits": self.hits, "misses": self.misses,
+                "revalidations": self.revalidations,
+                "entries": len(self._entries), "ttl": self.ttl,
+            }
+
+
+DATA_VERSION_SQL = "SELECT version FROM data_version WHERE id = 1;"
+FACULTIES_SQL = "SELECT * FROM faculties ORDER BY id;"
+FACULTY_FIELDS_SQL = """
+    SELECT faculty_id, field_id, label, position
+    FROM faculty_table_fields
+    ORDER BY faculty_id, position
+"""
+FACULTY_REQUIREMENTS_SQL = """
+    SELECT faculty_id, core_area
+    FROM faculty_required_core_areas
+    ORDER BY faculty_id, core_area
+"""
+CORE_AREAS_SQL = "SELECT name FROM core_areas ORDER BY name;"
+SYLLABI_SQL = """
+    SELECT id, institution, year, course_code, course_name, core_area, file_url
+    FROM syllabi
+    ORDER BY institution, year DESC, course_name
+"""
+STATS_AGG_SQL = """
+    SELECT institution, year, core_area, count
+    FROM stats_rollup
+    ORDER BY count DESC, institution, year, core_area
+"""
+SYLLABI_COLUMNS: ColumnSpec = [
+    ("id", "int32"), ("institution", "category"), ("year", "int32"), ("course_code", "string"),
+    ("course_name", "string"), ("core_area", "category"), ("file_url", "string"),
+]
+STATS_AGG_COLUMNS: ColumnSpec = [
+    ("institution", "category"), ("year", "int32"), ("core_area", "category"), ("count", "int64"),
+]
+# loose index scan: one index probe per distinct institution instead of reading every row
+INSTITUTIONS_SQL = """
+    WITH RECURSIVE inst AS (
+        (SELECT institution FROM syllabi ORDER BY institution LIMIT 1)
+        UNION ALL
+        SELECT (SELECT s.institution FROM syllabi s
+                WHERE s.institution > inst.institution
+                ORDER BY s.institution LIMIT 1)
+        FROM inst WHERE inst.institution IS NOT NULL
+    )
+    SELECT institution FROM inst WHERE institution IS NOT NULL
+"""
+
+
+@contextmanager
+def _read_cursor(budget: float = DB_LATENCY_BUDGET, **kwargs):
+    """Read-only pooled cursor whose pool wait and statements are bounded by `budget` seconds."""
+    with pooled_cursor(commit=False, timeout=budget, **kwargs) as cur:
+        # on a separate cursor: a named (server-side) cursor can only run its one query
+        with cur.connection.cursor() as setup:
+            setup.execute("SET LOCAL statement_timeout = %s;", (int(budget * 1000),))
+        yield cur
+
+
+def _load_data_version() -> int:
+    with _read_cursor() as cur:
+        cur.execute(DATA_VERSION_SQL)
+        row = cur.fetchone()
+    return row["version"] if row else 0
+
+
+def fetch_data_version() -> int:
+    return DB_BREAKER.call(_load_data_version)
+
+
+def _with_snapshot(name: str, load: Callable[..., Any], *args) -> Callable[[], Any]:
+    """Loader that reads the DB through the breaker and falls back to the local snapshot."""
+    def load_or_snapshot():
+        try:
+            return DB_BREAKER.call(lambda: load(*args))
+        except DB_UNAVAILABLE_ERRORS as db_error:
+            import snapshot  # only needed once the DB has failed
+            try:
+                return Degraded(snapshot.read(name, *args))
+            except snapshot.SnapshotUnavailable:
+                raise db_error
+    return load_or_snapshot
+
+
+def db_degraded() -> bool:
+    """True while the breaker is open, i.e. reads are being served from the snapshot."""
+    return DB_BREAKER.is_open
+
+
+_reference_cache = ReferenceCache(REFERENCE_CACHE_TTL, version_fn=fetch_data_version)
+# keyset pages are many and small; keep only the most recently used ones
+_page_cache = ReferenceCache(REFERENCE_CACHE_TTL, version_fn=fetch_data_version, max_entries=512)
+# stats change constantly; a short TTL bounds staleness across processes
+_stats_cache = ReferenceCache(STATS_CACHE_TTL)
+
+
+def invalidate_reference_cache(key: Optional[str] = None):
+    _reference_cache.invalidate(key)
+    _page_cache.invalidate()
+
+
+def reference_cache_stats() -> Dict[str, Any]:
+    return _reference_cache.stats()
+
+
+def _loader(name: str) -> Callable[[], Any]:
+    if DATA_ACCESS_BACKEND == "async":
+        import data_access_async  # psycopg 3 is only needed for this backend
+        return getattr(data_access_async, f"load_{name}")
+    return _SYNC_LOADERS[name]
+
+def prefetch_reference_data(keys: Tuple[str, ...] = ("faculties", "core_areas", "institutions")):
+    """With the async backend, load all missing reference entries in one round of concurrent queries.
+
+    Entries already cached (even if expired) are left to the normal `data_version` revalidation.
+    """
+    if DATA_ACCESS_BACKEND != "async":
+        return
+    missing = [k for k in keys if not _reference_cache.contains(k)]
+    if len(missing) < 2:
+        return
+    import data_access_async
+    generation = _reference_cache.generation
+    try:
+        version, values = DB_BREAKER.call(lambda: data_access_async.load_reference(missing))
+    except DB_UNAVAILABLE_ERRORS:
+        return  # the individual fetchers fall back to the snapshot
+    for key, value in values.items():
+        _reference_cache.prime(key, value, version, generation)
 
 def fetch_faculties() -> Tuple[list, dict]:
-    with pooled_cursor(commit=False) as cur:
-        cur.execute("SELECT * FROM faculties ORDER BY id;")
+    return _reference_cache.get("faculties", _with_snapshot("faculties", _loader("faculties")))
+
+def fetch_core_areas() -> list:
+    return _reference_cache.get("core_areas", _with_snapshot("core_areas", _loader("core_areas")))
+
+def fetch_syllabi_df() -> pd.DataFrame:
+    return _reference_cache.get("syllabi", _with_snapshot("syllabi_df", _loader("syllabi_df")))
+
+def fetch_syllabus_catalog() -> SyllabusCatalog:
+    # derived from the syllabi frame; shares its data_version, so both refresh together
+    return _reference_cache.get("catalog", lambda: SyllabusCatalog(fetch_syllabi_df()))
+
+def fetch_institutions() -> List[str]:
+    return _reference_cache.get("institutions", _with_snapshot("institutions", _loader("institutions")))
+
+def fetch_institution_years(institution: str) -> List[int]:
+    return _page_cache.get(f"years:{institution}",
+                           _with_snapshot("institution_years", _load_institution_years, institution))
+
+def fetch_syllabi_page(institution: Optional[str] = None, year_from: Optional[int] = None,
+                       year_to: Optional[int] = None, core_area: Optional[str] = None,
+                       after: Optional[SyllabiCursor] = None,
+                       limit: int = SYLLABI_PAGE_SIZE) -> Tuple[pd.DataFrame, Optional[SyllabiCursor]]:
+    """One keyset page in (institution, year DESC, course_name, id) order, plus the next cursor."""
+    key = repr(("page", institution, year_from, year_to, core_area, after, limit))
+    return _page_cache.get(key, _with_snapshot("syllabi_page", _load_syllabi_page, institution, year_from,
+                                               year_to, core_area, after, limit))
+
+def _load_institutions() -> List[str]:
+    with _read_cursor() as cur:
+        cur.execute(INSTITUTIONS_SQL)
+        return [r["institution"] for r in cur.fetchall()]
+
+INSTITUTION_YEARS_SQL = """
+    SELECT DISTINCT year FROM syllabi
+    WHERE institution = %s
+    ORDER BY year DESC
+"""
+
+def _load_institution_years(institution: str) -> List[int]:
+    with _read_cursor() as cur:
+        cur.execute(INSTITUTION_YEARS_SQL, (institution,))
+        return [r["year"] for r in cur.fetchall()]
+
+def syllabi_page_query(institution, year_from, year_to, core_area, after, limit) -> Tuple[str, list]:
+    """SQL (%s placeholders) and parameters of one keyset page, fetching one extra row."""
+    where, params = [], []
+    if institution is not None:
+        where.append("institution = %s")
+        params.append(institution)
+    if year_from is not None:
+        where.append("year >= %s")
+        params.append(year_from)
+    if year_to is not None:
+        where.append("year <= %s")
+        params.append(year_to)
+    if core_area is not None:
+        where.append("core_area = %s")
+        params.append(core_area)
+    if after is not None:
+        a_inst, a_year, a_name, a_id = after
+        where.append("""(institution > %s OR (institution = %s AND (year < %s OR
+                         (year = %s AND (course_name, id) > (%s, %s)))))""")
+        params += [a_inst, a_inst, a_year, a_year, a_name, a_id]
+    return f"""
+        SELECT id, institution, year, course_code, course_name, core_area, file_url
+        FROM syllabi
+        {"WHERE " + " AND ".join(where) if where else ""}
+        ORDER BY institution, year DESC, course_name, id
+        LIMIT %s
+    """, params + [limit + 1]
+
+def syllabi_page_result(rows: list, limit: int) -> Tuple[pd.DataFrame, Optional[SyllabiCursor]]:
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = (last["institution"], last["year"], last["course_name"], last["id"])
+    return pd.DataFrame(rows, columns=["id", "institution", "year", "course_code",
+                                       "course_name", "core_area", "file_url"]), next_cursor
+
+def _load_syllabi_page(institution, year_from, year_to, core_area, after, limit):
+    sql, params = syllabi_page_query(institution, year_from, year_to, core_area, after, limit)
+    with _read_cursor() as cur:
+        cur.execute(sql, params)
+        return syllabi_page_result(cur.fetchall(), limit)
+
+def _load_faculties() -> Tuple[list, dict]:
+    with _read_cursor() as cur:
+        cur.execute(FACULTIES_SQL)
         facs = cur.fetchall()
-        cur.execute("""
-            SELECT faculty_id, field_id, label, position
-            FROM faculty_table_fields
-            ORDER BY faculty_id, position
-        """)
+        cur.execute(FACULTY_FIELDS_SQL)
         fields = cur.fetchall()
+        cur.execute(FACULTY_REQUIREMENTS_SQL)
+        requirements = cur.fetchall()
+    return build_faculties(facs, fields, requirements)
 
+def build_faculties(facs: list, fields: list, requirements: list = ()) -> Tuple[list, dict]:
+    """(faculties, lookup by id) from faculty rows, their ordered table-field rows and required core areas."""
     fields_by_fac = {}
     for f in fields:
         fields_by_fac.setdefault(f["faculty_id"], []).append({"id": f["field_id"], "label": f["label"]})
+    required_by_fac = {}
+    for r in requirements:
+        required_by_fac.setdefault(r["faculty_id"], []).append(r["core_area"])
 
     faculties = [{
         "id": f["id"], "name": f["name"], "email": f["email"],
         "max_course_age_years": f["max_course_age_years"],
-        "table_fields": fields_by_fac.get(f["id"], [])
+        "table_fields": fields_by_fac.get(f["id"], []),
+        # empty: requirements not configured, no eligibility verdict (see validation.eligibility_report)
+        "required_core_areas": required_by_fac.get(f["id"], []),
     } for f in facs]
     lookup = {f["id"]: f for f in faculties}
     return faculties, lookup
 
-def fetch_core_areas() -> list:
-    with pooled_cursor(commit=False) as cur:
-        cur.execute("SELECT name FROM core_areas ORDER BY name;")
+def _load_core_areas() -> list:
+    with _read_cursor() as cur:
+        cur.execute(CORE_AREAS_SQL)
         return [r["name"] for r in cur.fetchall()]
 
-def fetch_syllabi_df() -> pd.DataFrame:
-    with pooled_cursor(commit=False) as cur:
-        cur.execute("""
-            SELECT id, institution, year, course_code, course_name, core_area, file_url
-            FROM syllabi
-            ORDER BY institution, year DESC, course_name
-        """)
-        rows = cur.fetchall()
-    return pd.DataFrame(rows)
+def _load_columnar(sql: str, spec: ColumnSpec, cursor_name: str,
+                   budget: float = DB_LATENCY_BUDGET) -> pd.DataFrame:
+    # server-side cursor + tuple rows: the result never exists as a list of dicts
+    with _read_cursor(budget, name=cursor_name, tuples=True) as cur:
+        cur.execute(sql)
+        return frame_from_chunks(fetch_chunks(cur), spec)
+
+def _load_syllabi_df() -> pd.DataFrame:
+    return _load_columnar(SYLLABI_SQL, SYLLABI_COLUMNS, "syllabi_df", DB_BULK_LATENCY_BUDGET)
+
+_SYNC_LOADERS: Dict[str, Callable[[], Any]] = {
+    "faculties": _load_faculties,
+    "core_areas": _load_core_areas,
+    "syllabi_df": _load_syllabi_df,
+    "institutions": _load_institutions,
+}
 
 def insert_stat_rows(rows: list):
     if not rows:
         return
+    # fails fast while the breaker is open; stats_ingest spills the batch for later replay
+    DB_BREAKER.call(lambda: _write_stat_rows(rows))
+    _stats_cache.invalidate()
+
+def _write_stat_rows(rows: list):
+    # raw events and the rollup move together, in one transaction
+    groups = Counter((inst or "—", int(year or 0), area or "—") for inst, year, area in rows)
     with pooled_cursor() as cur:
-        cur.executemany("""
+        cur.execute("SELECT pg_advisory_xact_lock_shared(%s);", (STATS_MERGE_LOCK_ID,))
+        execute_values(cur, """
             INSERT INTO stats (institution, year, core_area)
-            VALUES (%s, %s, %s)
-        """, rows)
+            VALUES %s
+        """, rows, page_size=1000)
+        execute_values(cur, """
+            INSERT INTO stats_rollup (institution, year, core_area, count)
+            VALUES %s
+            ON CONFLICT (institution, year, core_area)
+            DO UPDATE SET count = stats_rollup.count + EXCLUDED.count
+        """, [(inst, year, area, n) for (inst, year, area), n in sorted(groups.items())], page_size=1000)
 
 def fetch_stats_agg_df() -> pd.DataFrame:
-    with pooled_cursor(commit=False) as cur:
-        cur.execute("""
-            SELECT institution, year, core_area, COUNT(*) AS count
-            FROM stats
-            GROUP BY institution, year, core_area
-            ORDER BY count DESC, institution, year, core_area
-        """)
-        rows = cur.fetchall()
-    return pd.DataFrame(rows)
+    return _stats_cache.get("stats_agg", lambda: DB_BREAKER.call(_load_stats_agg_df))
+
+def _load_stats_agg_df() -> pd.DataFrame:
+    return _load_columnar(STATS_AGG_SQL, STATS_AGG_COLUMNS, "stats_agg_df")
 
 def course_is_fresh(year: int, faculty_id: str) -> bool:
-    with pooled_cursor(commit=False) as cur:
-        cur.execute("SELECT max_course_age_years FROM faculties WHERE id=%s", (faculty_id,))
-        row = cur.fetchone()
+    # single-course check; bulk validation lives in validation.freshness_matrix
+    _, lookup = fetch_faculties()
+    row = lookup.get(faculty_id)
     if not row:
         return True
     cutoff_year = datetime_now_year_minus(row["max_course_age_years"])
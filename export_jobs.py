@@ -0,0 +1,184 @@
+# export_jobs.py
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from utils.export import export_steps, upload_key, write_faculty_packages
+
+EXPORT_WORKERS = int(os.getenv("EXPORT_WORKERS", "2"))
+EXPORT_MAX_PENDING = int(os.getenv("EXPORT_MAX_PENDING", "16"))
+EXPORT_JOB_DIR = os.getenv("EXPORT_JOB_DIR", os.path.join(tempfile.gettempdir(), "core-courses-exports"))
+# finished archives contain applicant PII; they are deleted this long after the build
+EXPORT_TTL_SECONDS = float(os.getenv("EXPORT_TTL_SECONDS", "600"))
+# seconds between cleanup passes of the background sweeper
+EXPORT_CLEANUP_INTERVAL = float(os.getenv("EXPORT_CLEANUP_INTERVAL", "60"))
+
+log = logging.getLogger(__name__)
+
+
+class ExportQueueFull(RuntimeError):
+    pass
+
+
+@dataclass
+class ExportJob:
+    key: str
+    status: str = "queued"  # queued | running | done | failed
+    done: int = 0
+    total: int = 0
+    label: str = ""
+    path: Optional[str] = None
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+
+    @property
+    def fraction(self) -> float:
+        return self.done / self.total if self.total else 0.0
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "failed")
+
+
+def _upload_digest(value) -> str:
+    # blob store paths are named by their SHA-256 already
+    if isinstance(value, (str, os.PathLike)):
+        return os.path.basename(os.fspath(value))
+    return hashlib.sha256(bytes(value)).hexdigest()
+
+
+def export_key(applicant: Dict[str, Any], selections: List[Dict[str, Any]], chosen_faculties: List[str],
+               uploaded_files: Dict[str, Any], faculty_lookup: dict, table_format: str = "xlsx") -> str:
+    """Hash of everything that shapes the archive; equal inputs map to the same cached build."""
+    used = {upload_key(sel) for sel in selections} & set(uploaded_files)
+    payload = json.dumps({
+        "applicant": applicant,
+        "selections": selections,
+        "faculties": [faculty_lookup[fid] for fid in chosen_faculties],
+        "uploads": {k: _upload_digest(uploaded_files[k]) for k in sorted(used)},
+        "format": table_format,
+    }, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ExportJobQueue:
+    """Runs archive builds on a bounded thread pool.
+
+    Retention: a finished archive is deleted `ttl` seconds (EXPORT_TTL_SECONDS, default
+    10 minutes) after its build finished. A daemon thread runs `cleanup` every
+    `cleanup_interval` seconds, so the TTL holds even when no new exports are submitted.
+    """
+
+    def __init__(self, workers: int = EXPORT_WORKERS, max_pending: int = EXPORT_MAX_PENDING,
+                 root: str = EXPORT_JOB_DIR, ttl: float = EXPORT_TTL_SECONDS,
+                 cleanup_interval: float = EXPORT_CLEANUP_INTERVAL):
+        self.max_pending = max_pending
+        self.root = root
+        self.ttl = ttl
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="export")
+        self._jobs: Dict[str, ExportJob] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        os.makedirs(root, exist_ok=True)
+        if cleanup_interval > 0:
+            threading.Thread(target=self._sweep, args=(cleanup_interval,), name="export-cleanup",
+                             daemon=True).start()
+
+    def submit(self, applicant, selections, chosen_faculties, uploaded_files, faculty_lookup,
+               table_format: str = "xlsx") -> ExportJob:
+        self.cleanup()
+        key = export_key(applicant, selections, chosen_faculties, uploaded_files, faculty_lookup, table_format)
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None and job.status != "failed" and (job.path is None or os.path.exists(job.path)):
+                return job
+            pending = sum(1 for j in self._jobs.values() if not j.finished)
+            if pending >= self.max_pending:
+                raise ExportQueueFull(f"{pending} exports already pending")
+            job = ExportJob(key, total=export_steps(selections, chosen_faculties, uploaded_files))
+            self._jobs[key] = job
+        self._executor.submit(self._run, job, applicant, selections, chosen_faculties,
+                              uploaded_files, faculty_lookup, table_format)
+        return job
+
+    def get(self, key: str) -> Optional[ExportJob]:
+        with self._lock:
+            return self._jobs.get(key)
+
+    def _run(self, job: ExportJob, applicant, selections, chosen_faculties, uploaded_files,
+             faculty_lookup, table_format):
+        job.status = "running"
+        final = os.path.join(self.root, f"{job.key}.zip")
+        fd, tmp = tempfile.mkstemp(dir=self.root, prefix=".building-", suffix=".zip")
+
+        def progress(done, total, label):
+            job.done, job.total, job.label = done, total, label
+
+        try:
+            with os.fdopen(fd, "wb") as out, zipfile.ZipFile(out, mode="w", compression=zipfile.ZIP_DEFLATED) as zf:
+                write_faculty_packages(zf, applicant, selections, chosen_faculties, uploaded_files,
+                                       faculty_lookup, table_format, progress)
+            os.replace(tmp, final)
+            job.path = final
+            job.status = "done"
+        except Exception as e:
+            log.exception("export %s failed", job.key)
+            job.error = str(e)
+            job.status = "failed"
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        finally:
+            job.finished_at = time.time()
+
+    def cleanup(self) -> int:
+        """Forget finished jobs older than the TTL and delete their archives."""
+        now = time.time()
+        with self._lock:
+            expired = [k for k, j in self._jobs.items() if j.finished and now - j.finished_at > self.ttl]
+            jobs = [self._jobs.pop(k) for k in expired]
+        for job in jobs:
+            if job.path and os.path.exists(job.path):
+                os.remove(job.path)
+        # archives and partial builds left behind by earlier processes
+        with self._lock:
+            live = {j.path for j in self._jobs.values() if j.path}
+        for entry in os.scandir(self.root):
+            try:
+                stale = entry.path not in live and now - entry.stat().st_mtime > self.ttl
+                if stale:
+                    os.remove(entry.path)
+            except FileNotFoundError:
+                continue
+        return len(jobs)
+
+    def _sweep(self, interval: float):
+        while not self._stop.wait(interval):
+            try:
+                self.cleanup()
+            except Exception:
+                log.exception("export cleanup failed")
+
+    def shutdown(self):
+        self._stop.set()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_queue: Optional[ExportJobQueue] = None
+_queue_lock = threading.Lock()
+
+
+def get_export_queue() -> ExportJobQueue:
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = ExportJobQueue()
+        return _queue
@@ -0,0 +1,218 @@
+# import_catalog.py
+# Bulk syllabus catalog import:
+#   python import_catalog.py catalogs/hadassah_2024.csv [--chunk-size 5000] [--resume]
+import argparse
+import csv
+import io
+import json
+import math
+import os
+import sys
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterator, Optional
+
+COLUMNS = ["institution", "year", "course_code", "course_name", "core_area", "file_url"]
+REQUIRED = ["institution", "year", "course_code", "course_name", "core_area"]
+# catalog years outside this range are typos (e.g. "20224") and are rejected as invalid rows
+MIN_YEAR = int(os.getenv("IMPORT_MIN_YEAR", "1900"))
+MAX_YEAR = int(os.getenv("IMPORT_MAX_YEAR", str(datetime.now().year + 1)))
+
+# header aliases accepted in addition to the column names themselves
+ALIASES = {
+    "מוסד": "institution", "מוסד לימוד": "institution",
+    "שנה": "year",
+    "מס' קורס": "course_code", "מספר קורס": "course_code",
+    "שם הקורס": "course_name",
+    "תחום ליבה": "core_area",
+    "קישור לסילבוס": "file_url", "url": "file_url",
+}
+
+
+def _canonical(header: Any) -> str:
+    name = str(header or "").strip()
+    return ALIASES.get(name, ALIASES.get(name.lower(), name.lower()))
+
+
+def read_csv(path: str) -> Iterator[Dict[str, Any]]:
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.reader(f)
+        headers = [_canonical(h) for h in next(reader, [])]
+        for values in reader:
+            yield dict(zip(headers, values))
+
+
+def read_jsonl(path: str) -> Iterator[Dict[str, Any]]:
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield {_canonical(k): v for k, v in json.loads(line).items()}
+
+
+def read_xlsx(path: str) -> Iterator[Dict[str, Any]]:
+    from openpyxl import load_workbook
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = wb.active.iter_rows(values_only=True)
+        headers = [_canonical(h) for h in next(rows, ())]
+        for values in rows:
+            if any(v is not None for v in values):
+                yield dict(zip(headers, values))
+    finally:
+        wb.close()
+
+
+READERS = {".csv": read_csv, ".jsonl": read_jsonl, ".ndjson": read_jsonl, ".xlsx": read_xlsx}
+
+
+def clean_record(rec: Dict[str, Any]) -> Optional[list]:
+    """Row in COLUMNS order, or None when a required field is missing or the year is not a plausible year."""
+    row = {c: ("" if rec.get(c) is None else str(rec.get(c)).strip()) for c in COLUMNS}
+    if any(not row[c] for c in REQUIRED):
+        return None
+    try:
+        year = float(row["year"])
+    except ValueError:
+        return None
+    if not math.isfinite(year) or not MIN_YEAR <= year <= MAX_YEAR:  # "nan", "inf", out of range
+        return None
+    row["year"] = int(year)
+    return [row[c] for c in COLUMNS]
+
+
+class Checkpoint:
+    """Rows committed so far for one source file, kept next to it for --resume."""
+
+    def __init__(self, source: str):
+        self.path = source + ".import-state.json"
+        stat = os.stat(source)
+        self.fingerprint = {"size": stat.st_size, "mtime": int(stat.st_mtime)}
+
+    def load(self) -> int:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return 0
+        if state.get("fingerprint") != self.fingerprint:
+            raise SystemExit(f"{self.path} belongs to a different version of the file; delete it to start over")
+        return int(state.get("rows_done", 0))
+
+    def save(self, rows_done: int):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"fingerprint": self.fingerprint, "rows_done": rows_done}, f)
+        os.replace(tmp, self.path)
+
+    def clear(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+STAGING_DDL = """
+    CREATE TEMP TABLE IF NOT EXISTS syllabi_staging (
+        line_no BIGINT NOT NULL,
+        institution TEXT NOT NULL,
+        year INT NOT NULL,
+        course_code TEXT NOT NULL,
+        course_name TEXT NOT NULL,
+        core_area TEXT NOT NULL,
+        file_url TEXT
+    ) ON COMMIT DELETE ROWS;
+"""
+
+UPSERT = """
+    INSERT INTO syllabi (institution, year, course_code, course_name, core_area, file_url)
+    SELECT DISTINCT ON (institution, year, course_code)
+           institution, year, course_code, course_name, core_area, NULLIF(file_url, '')
+    FROM syllabi_staging st
+    WHERE EXISTS (SELECT 1 FROM core_areas c WHERE c.name = st.core_area)
+    ORDER BY institution, year, course_code, line_no DESC
+    ON CONFLICT (institution, year, course_code) DO UPDATE SET
+        course_name = EXCLUDED.course_name,
+        core_area = EXCLUDED.core_area,
+        file_url = EXCLUDED.file_url
+    WHERE (syllabi.course_name, syllabi.core_area, syllabi.file_url)
+          IS DISTINCT FROM (EXCLUDED.course_name, EXCLUDED.core_area, EXCLUDED.file_url)
+    RETURNING (xmax = 0) AS inserted
+"""
+
+
+def load_chunk(chunk: list) -> Dict[str, int]:
+    """COPY one chunk of [line_no, *COLUMNS] rows into staging and merge it into syllabi, in one transaction."""
+    from db import pooled_cursor
+    buf = io.StringIO()
+    csv.writer(buf).writerows(chunk)
+    buf.seek(0)
+
+    with pooled_cursor() as cur:
+        cur.execute(STAGING_DDL)
+        cur.copy_expert(
+            "COPY syllabi_staging (line_no, institution, year, course_code, course_name, core_area, file_url) "
+            "FROM STDIN WITH (FORMAT csv)", buf)
+        cur.execute("""
+            SELECT COUNT(*) AS c FROM syllabi_staging st
+            WHERE NOT EXISTS (SELECT 1 FROM core_areas c WHERE c.name = st.core_area)
+        """)
+        unknown_area = cur.fetchone()["c"]
+        cur.execute(UPSERT)
+        results = cur.fetchall()
+    inserted = sum(1 for r in results if r["inserted"])
+    return {"inserted": inserted, "updated": len(results) - inserted, "unknown_core_area": unknown_area}
+
+
+def run_import(path: str, chunk_size: int, resume: bool, log=sys.stderr) -> Dict[str, int]:
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in READERS:
+        raise SystemExit(f"unsupported file type {ext!r}; expected one of {sorted(READERS)}")
+    checkpoint = Checkpoint(path)
+    skip = checkpoint.load() if resume else 0
+    totals = {"read": skip, "inserted": 0, "updated": 0, "unknown_core_area": 0, "invalid": 0}
+    if skip:
+        print(f"resuming after {skip} rows", file=log)
+
+    started = time.monotonic()
+    chunk = []
+
+    def flush():
+        stats = load_chunk(chunk)
+        for k, v in stats.items():
+            totals[k] += v
+        checkpoint.save(totals["read"])
+        elapsed = time.monotonic() - started
+        rate = (totals["read"] - skip) / elapsed if elapsed else 0.0
+        print(f"{totals['read']} rows read | {totals['inserted']} inserted | {totals['updated']} updated | "
+              f"{totals['unknown_core_area'] + totals['invalid']} rejected | {rate:,.0f} rows/s", file=log)
+
+    for line_no, rec in enumerate(READERS[ext](path), start=1):
+        if line_no <= skip:
+            continue
+        totals["read"] = line_no
+        row = clean_record(rec)
+        if row is None:
+            totals["invalid"] += 1
+            continue
+        chunk.append([line_no] + row)
+        if len(chunk) >= chunk_size:
+            flush()
+            chunk = []
+    if chunk:
+        flush()
+    checkpoint.clear()
+    return totals
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Bulk-import a syllabus catalog (CSV/JSONL/XLSX) into `syllabi`.")
+    ap.add_argument("path")
+    ap.add_argument("--chunk-size", type=int, default=5000, help="rows per COPY/upsert transaction")
+    ap.add_argument("--resume", action="store_true", help="continue after the last committed chunk")
+    args = ap.parse_args(argv)
+    totals = run_import(args.path, args.chunk_size, args.resume)
+    print(json.dumps(totals, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+# pool.py
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+import psycopg2
+from psycopg2 import extensions
+from psycopg2.pool import PoolError
+
+
+class PoolTimeout(PoolError):
+    pass
+
+
+def _percentile(samples, q: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class BlockingConnectionPool:
+    """Thread-safe psycopg2 pool that blocks (up to `timeout`) when exhausted.
+
+    Connections are health-checked on checkout once they have been idle longer
+    than `health_check_after`, and recycled after `max_idle` seconds idle or
+    `max_lifetime` seconds since they were opened.
+    """
+
+    def __init__(self, minconn: int, maxconn: int, timeout: float = 10.0,
+                 max_idle: float = 300.0, max_lifetime: float = 1800.0,
+                 health_check_after: float = 30.0, sample_size: int = 1024,
+                 **connect_kwargs):
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.max_lifetime = max_lifetime
+        self.health_check_after = health_check_after
+        self._connect_kwargs = connect_kwargs
+        self._cond = threading.Condition()
+        self._idle: deque = deque()        # (conn, opened_at, last_used)
+        self._in_use: Dict[int, tuple] = {}  # id(conn) -> (conn, opened_at, checked_out_at)
+        self._size = 0
+        self._closed = False
+
+        self._waiting = 0
+        self._peak_in_use = 0
+        self._checkouts = 0
+        self._failed_checkouts = 0
+        self._timeouts = 0
+        self._recycled = 0
+        self._wait_times: deque = deque(maxlen=sample_size)
+        self._checkout_durations: deque = deque(maxlen=sample_size)
+
+        for _ in range(minconn):
+            conn = self._connect()
+            self._idle.append((conn, time.monotonic(), time.monotonic()))
+            self._size += 1
+
+    def _connect(self):
+        return psycopg2.connect(**self._connect_kwargs)
+
+    @staticmethod
+    def _close_quietly(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _is_healthy(self, conn) -> bool:
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    def _prepare(self, item):
+        """Return a usable connection for an idle pool entry, reconnecting if needed."""
+        now = time.monotonic()
+        if item is None:
+            return self._connect(), now
+        conn, opened_at, last_used = item
+        stale = (
+            conn.closed
+            or now - opened_at > self.max_lifetime
+            or now - last_used > self.max_idle
+            or (now - last_used > self.health_check_after and not self._is_healthy(conn))
+        )
+        if stale:
+            self._close_quietly(conn)
+            with self._cond:
+                self._recycled += 1
+            return self._connect(), now
+        return conn, opened_at
+
+    def getconn(self, timeout: Optional[float] = None):
+        timeout = self.timeout if timeout is None else timeout
+        started = time.monotonic()
+        deadline = started + timeout
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise PoolError("connection pool is closed")
+                if self._idle:
+                    item = self._idle.pop()  # LIFO keeps the warmest connections busy
+                    break
+                if self._size < self.maxconn:
+                    self._size += 1
+                    item = None
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._failed_checkouts += 1
+                    self._timeouts += 1
+                    raise PoolTimeout(f"no connection available within {timeout:.1f}s "
+                                      f"(maxconn={self.maxconn})")
+                self._waiting += 1
+                try:
+                    self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+
+        try:
+            conn, opened_at = self._prepare(item)
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._failed_checkouts += 1
+                self._cond.notify()
+            raise
+
+        now = time.monotonic()
+        with self._cond:
+            self._in_use[id(conn)] = (conn, opened_at, now)
+            self._checkouts += 1
+            self._peak_in_use = max(self._peak_in_use, len(self._in_use))
+            self._wait_times.append(now - started)
+        return conn
+
+    def putconn(self, conn, close: bool = False):
+        now = time.monotonic()
+        with self._cond:
+            entry = self._in_use.pop(id(conn), None)
+            if entry is None:
+                raise PoolError("trying to put unkeyed connection")
+            _, opened_at, checked_out_at = entry
+            self._checkout_durations.append(now - checked_out_at)
+
+        discard = close or self._closed or conn.closed or now - opened_at > self.max_lifetime
+        if not discard and conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+            try:
+                conn.rollback()
+            except Exception:
+                discard = True
+
+        with self._cond:
+            if discard:
+                self._close_quietly(conn)
+                self._size -= 1
+                if not close:
+                    self._recycled += 1
+            else:
+                self._idle.append((conn, opened_at, now))
+            self._cond.notify()
+
+    def closeall(self):
+        with self._cond:
+            self._closed = True
+            while self._idle:
+                conn, _, _ = self._idle.pop()
+                self._close_quietly(conn)
+                self._size -= 1
+            self._cond.notify_all()
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._cond:
+            in_use = len(self._in_use)
+            waits = list(self._wait_times)
+            durations = list(self._checkout_durations)
+            return {
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": in_use,
+                "maxconn": self.maxconn,
+                "saturation": in_use / self.maxconn if self.maxconn else 0.0,
+                "peak_in_use": self._peak_in_use,
+                "waiting": self._waiting,
+                "checkouts": self._checkouts,
+                "failed_checkouts": self._failed_checkouts,
+                "timeouts": self._timeouts,
+                "recycled": self._recycled,
+                "wait_p50_s": _percentile(waits, 0.50),
+                "wait_p95_s": _percentile(waits, 0.95),
+                "wait_max_s": max(waits, default=0.0),
+                "checkout_p50_s": _percentile(durations, 0.50),
+                "checkout_p95_s": _percentile(durations, 0.95),
+                "checkout_max_s": max(durations, default=0.0),
+            }
@@ -0,0 +1,253 @@
+# query_metrics.py
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+import psycopg2
+from psycopg2.extensions import TRANSACTION_STATUS_INTRANS, cursor as _plain_cursor
+from psycopg2.extras import RealDictCursor
+
+# off by default: attribution walks the stack on every statement
+QUERY_METRICS = os.getenv("QUERY_METRICS", "0") == "1"
+QUERY_SLOW_MS = float(os.getenv("QUERY_SLOW_MS", "200"))
+QUERY_METRICS_SAMPLES = int(os.getenv("QUERY_METRICS_SAMPLES", "2048"))
+QUERY_METRICS_FILE = os.getenv("QUERY_METRICS_FILE", "")
+QUERY_METRICS_DUMP_INTERVAL = float(os.getenv("QUERY_METRICS_DUMP_INTERVAL", "15"))
+EXPLAIN_COOLDOWN = 300.0
+
+log = logging.getLogger("slow_queries")
+
+_SKIP_MODULES = {__name__, "db", "contextlib", "psycopg2.extras", "psycopg2.extensions"}
+
+
+def caller_label() -> str:
+    """`module.function` of the code that issued the statement, preferring data_access functions."""
+    frame = sys._getframe(2)
+    fallback = None
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "")
+        if module == "data_access":
+            return f"data_access.{frame.f_code.co_name}"
+        if fallback is None and module not in _SKIP_MODULES:
+            fallback = f"{module}.{frame.f_code.co_name}"
+        frame = frame.f_back
+    return fallback or "unknown"
+
+
+def _escape(label: str) -> str:
+    return label.replace("\\", "\\\\").replace('"', '\\"')
+
+
+def _pct(ordered: List[float], q: float) -> float:
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+
+class _Series:
+    __slots__ = ("calls", "rows", "seconds", "slow", "samples")
+
+    def __init__(self, max_samples: int):
+        self.calls = 0
+        self.rows = 0
+        self.seconds = 0.0
+        self.slow = 0
+        self.samples: deque = deque(maxlen=max_samples)
+
+
+class QueryMetrics:
+    """Per-function statement timings plus per-rerun query/row counts.
+
+    Reruns are delimited by `begin_rerun`/`end_rerun` calls from the app script;
+    statements issued on the script thread in between are counted against that
+    rerun. Statements from background threads (stats writer, exports) only count
+    towards the per-function series.
+    """
+
+    def __init__(self, max_samples: int = QUERY_METRICS_SAMPLES, slow_ms: float = QUERY_SLOW_MS):
+        self.max_samples = max_samples
+        self.slow_seconds = slow_ms / 1000
+        self._lock = threading.Lock()
+        self._series: Dict[str, _Series] = {}
+        self._reruns: deque = deque(maxlen=max_samples)  # (queries, rows, seconds)
+        self._local = threading.local()
+        self._explained: Dict[str, float] = {}
+        self._last_dump = 0.0
+
+    def record(self, label: str, seconds: float, rows: int, slow: bool = False):
+        with self._lock:
+            s = self._series.get(label)
+            if s is None:
+                s = self._series[label] = _Series(self.max_samples)
+            s.calls += 1
+            s.rows += max(rows, 0)
+            s.seconds += seconds
+            s.slow += slow
+            s.samples.append(seconds)
+        current = getattr(self._local, "rerun", None)
+        if current is not None:
+            current[0] += 1
+            current[1] += max(rows, 0)
+            current[2] += seconds
+
+    def begin_rerun(self):
+        # a rerun cut short by st.rerun()/st.stop() or an exception never reached end_rerun;
+        # its partial counts are dropped rather than recorded late or added to this one
+        self._local.rerun = [0, 0, 0.0]
+
+    def end_rerun(self):
+        current = getattr(self._local, "rerun", None)
+        if current is None:
+            return
+        self._local.rerun = None
+        with self._lock:
+            self._reruns.append(tuple(current))
+        if QUERY_METRICS_FILE and time.monotonic() - self._last_dump > QUERY_METRICS_DUMP_INTERVAL:
+            self._last_dump = time.monotonic()
+            self.dump(QUERY_METRICS_FILE)
+
+    def current_rerun(self) -> Dict[str, Any]:
+        current = getattr(self._local, "rerun", None) or [0, 0, 0.0]
+        return {"queries": current[0], "rows": current[1], "ms": current[2] * 1e3}
+
+    def should_explain(self, label: str) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            if now - self._explained.get(label, -EXPLAIN_COOLDOWN) < EXPLAIN_COOLDOWN:
+                return False
+            self._explained[label] = now
+            return True
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            items = [(label, s.calls, s.rows, s.seconds, s.slow, sorted(s.samples)) for label, s in self._series.items()]
+        rows = [{
+            "function": label, "calls": calls, "rows": n_rows, "total_ms": seconds * 1e3,
+            "p50_ms": _pct(samples, 0.50) * 1e3, "p95_ms": _pct(samples, 0.95) * 1e3,
+            "max_ms": (samples[-1] if samples else 0.0) * 1e3, "slow": slow,
+        } for label, calls, n_rows, seconds, slow, samples in items]
+        return sorted(rows, key=lambda r: r["total_ms"], reverse=True)
+
+    def rerun_summary(self) -> Dict[str, Any]:
+        with self._lock:
+            reruns = list(self._reruns)
+        queries = sorted(r[0] for r in reruns)
+        rows = sorted(r[1] for r in reruns)
+        return {
+            "reruns": len(reruns),
+            "queries_p50": _pct(queries, 0.50), "queries_p95": _pct(queries, 0.95),
+            "queries_max": queries[-1] if queries else 0,
+            "rows_p50": _pct(rows, 0.50), "rows_p95": _pct(rows, 0.95),
+            "ms_p50": _pct(sorted(r[2] for r in reruns), 0.50) * 1e3,
+        }
+
+    def prometheus(self) -> str:
+        lines = [
+            "# HELP app_db_query_seconds Statement latency by calling function.",
+            "# TYPE app_db_query_seconds summary",
+        ]
+        rows = self.snapshot()
+        for r in rows:
+            fn = _escape(r["function"])
+            lines.append(f'app_db_query_seconds{{function="{fn}",quantile="0.5"}} {r["p50_ms"] / 1e3:.6f}')
+            lines.append(f'app_db_query_seconds{{function="{fn}",quantile="0.95"}} {r["p95_ms"] / 1e3:.6f}')
+            lines.append(f'app_db_query_seconds_sum{{function="{fn}"}} {r["total_ms"] / 1e3:.6f}')
+            lines.append(f'app_db_query_seconds_count{{function="{fn}"}} {r["calls"]}')
+        lines += ["# HELP app_db_query_rows_total Rows returned or affected by calling function.",
+                  "# TYPE app_db_query_rows_total counter"]
+        for r in rows:
+            fn = _escape(r["function"])
+            lines.append(f'app_db_query_rows_total{{function="{fn}"}} {r["rows"]}')
+        lines += ["# HELP app_db_slow_queries_total Statements slower than the slow-query threshold.",
+                  "# TYPE app_db_slow_queries_total counter"]
+        for r in rows:
+            fn = _escape(r["function"])
+            lines.append(f'app_db_slow_queries_total{{function="{fn}"}} {r["slow"]}')
+        summary = self.rerun_summary()
+        lines += ["# HELP app_db_queries_per_rerun Statements issued per Streamlit rerun.",
+                  "# TYPE app_db_queries_per_rerun summary",
+                  f'app_db_queries_per_rerun{{quantile="0.5"}} {summary["queries_p50"]}',
+                  f'app_db_queries_per_rerun{{quantile="0.95"}} {summary["queries_p95"]}',
+                  f'app_db_queries_per_rerun_count {summary["reruns"]}']
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path: str):
+        directory = os.path.dirname(os.path.abspath(path))
+        try:
+            fd, tmp = tempfile.mkstemp(dir=directory, prefix=".metrics-")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(self.prometheus())
+            os.replace(tmp, path)
+        except OSError:
+            log.exception("could not write query metrics to %s", path)
+
+
+METRICS = QueryMetrics()
+
+
+class _Instrumented:
+    """Cursor mixin that reports every execute/executemany to METRICS."""
+
+    def execute(self, query, vars=None):
+        label = caller_label()
+        t0 = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            elapsed = time.perf_counter() - t0
+            slow = elapsed >= METRICS.slow_seconds
+            METRICS.record(label, elapsed, self.rowcount, slow)
+            if slow:
+                self._log_slow(label, elapsed, query, vars)
+
+    def executemany(self, query, vars_list):
+        label = caller_label()
+        t0 = time.perf_counter()
+        try:
+            return super().executemany(query, vars_list)
+        finally:
+            elapsed = time.perf_counter() - t0
+            slow = elapsed >= METRICS.slow_seconds
+            METRICS.record(label, elapsed, self.rowcount, slow)
+            if slow:
+                log.warning("slow executemany in %s: %.1f ms\n%s", label, elapsed * 1e3, query)
+
+    def _log_slow(self, label: str, elapsed: float, query, vars):
+        text = query if isinstance(query, str) else str(query)
+        plan: Optional[str] = None
+        in_transaction = self.connection.get_transaction_status() == TRANSACTION_STATUS_INTRANS
+        if in_transaction and text.lstrip().upper().startswith(("SELECT", "WITH")) and METRICS.should_explain(label):
+            # a separate cursor leaves the caller's result set untouched; the savepoint keeps
+            # a failing EXPLAIN from aborting the caller's transaction
+            with self.connection.cursor(cursor_factory=_plain_cursor) as explain:
+                explain.execute("SAVEPOINT query_metrics_explain")
+                try:
+                    explain.execute("EXPLAIN " + text, vars)
+                    plan = "\n".join(r[0] for r in explain.fetchall())
+                    explain.execute("RELEASE SAVEPOINT query_metrics_explain")
+                except psycopg2.Error as e:
+                    explain.execute("ROLLBACK TO SAVEPOINT query_metrics_explain")
+                    plan = f"(EXPLAIN failed: {e})"
+        log.warning("slow query in %s: %.1f ms\n%s%s", label, elapsed * 1e3, text.strip(),
+                    f"\n{plan}" if plan else "")
+
+
+class InstrumentedCursor(_Instrumented, RealDictCursor):
+    pass
+
+
+class InstrumentedTupleCursor(_Instrumented, _plain_cursor):
+    pass
+
+
+def begin_rerun():
+    if QUERY_METRICS:
+        METRICS.begin_rerun()
+
+
+def end_rerun():
+    if QUERY_METRICS:
+        METRICS.end_rerun()
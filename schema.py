@@ -1,8 +1,33 @@
 # schema.py
+import logging
+from psycopg2 import errors
+from typing import List, Tuple
 from db import pooled_cursor
 
-def init_db():
-    ddl = """
+log = logging.getLogger(__name__)
+
+# tables cached by data_access.ReferenceCache; any write bumps data_version
+REFERENCE_TABLES = ("faculties", "faculty_table_fields", "core_areas", "syllabi")
+
+# arbitrary constant: serializes migrations across app processes
+MIGRATION_LOCK_ID = 72_410_001
+# stats writers hold it shared, analytics.merge_stats exclusively: no insert is in flight
+# while the merge watermark advances, so ids below it can no longer appear
+STATS_MERGE_LOCK_ID = 72_410_002
+
+# example requirements for the seeded faculties. Replace them per deployment with
+#   INSERT INTO faculty_required_core_areas (faculty_id, core_area) VALUES ('<faculty>', '<core area>');
+# (the core area must exist in core_areas); a faculty with no rows gets no eligibility verdict
+EXAMPLE_REQUIRED_CORE_AREAS: List[Tuple[str, str]] = [
+    *[("huji", a) for a in ("כימיה כללית", "כימיה אורגנית", "ביוכימיה", "ביולוגיה של התא", "פיזיקה")],
+    *[("bgu", a) for a in ("כימיה כללית", "כימיה אורגנית", "ביולוגיה של התא", "סטטיסטיקה")],
+    *[("tau", a) for a in ("כימיה כללית", "כימיה אורגנית", "ביוכימיה", "פיזיקה", "סטטיסטיקה")],
+]
+
+# (version, description, sql). Append only; every statement must be idempotent so
+# databases created before schema_version existed upgrade cleanly from version 0.
+MIGRATIONS: List[Tuple[int, str, str]] = [
+    (1, "base tables", """
     CREATE TABLE IF NOT EXISTS faculties (
         id TEXT PRIMARY KEY,
         name TEXT NOT NULL,
@@ -31,65 +56,213 @@ def init_db():
         institution TEXT, year INT, core_area TEXT,
         created_at TIMESTAMPTZ DEFAULT NOW()
     );
-    """
+    """),
+    (2, "data_version row and reference-table triggers", """
+    CREATE TABLE IF NOT EXISTS data_version (
+        id INT PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+        version BIGINT NOT NULL DEFAULT 0
+    );
+    INSERT INTO data_version (id, version) VALUES (1, 0) ON CONFLICT (id) DO NOTHING;
+    CREATE OR REPLACE FUNCTION bump_data_version() RETURNS trigger AS $$
+    BEGIN
+        UPDATE data_version SET version = version + 1 WHERE id = 1;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+    """ + "".join(f"""
+    DROP TRIGGER IF EXISTS {table}_bump_data_version ON {table};
+    CREATE TRIGGER {table}_bump_data_version
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {table}
+    FOR EACH STATEMENT EXECUTE PROCEDURE bump_data_version();
+    """ for table in REFERENCE_TABLES)),
+    (3, "stats rollup", """
+    CREATE TABLE IF NOT EXISTS stats_rollup (
+        institution TEXT NOT NULL,
+        year INT NOT NULL,
+        core_area TEXT NOT NULL,
+        count BIGINT NOT NULL DEFAULT 0,
+        PRIMARY KEY (institution, year, core_area)
+    );
+    -- one-off backfill when the rollup is introduced on a database that already has stats
+    INSERT INTO stats_rollup (institution, year, core_area, count)
+    SELECT COALESCE(NULLIF(institution, ''), '—'), COALESCE(year, 0), COALESCE(NULLIF(core_area, ''), '—'), COUNT(*)
+    FROM stats
+    WHERE NOT EXISTS (SELECT 1 FROM stats_rollup)
+    GROUP BY 1, 2, 3
+    ON CONFLICT DO NOTHING;
+    """),
+    (4, "syllabi indexes", """
+    -- keyset pagination order and the institution/year filters of step 2
+    CREATE INDEX IF NOT EXISTS syllabi_inst_year_name_idx
+        ON syllabi (institution, year DESC, course_name, id);
+    CREATE INDEX IF NOT EXISTS syllabi_core_area_year_idx
+        ON syllabi (core_area, year DESC);
+    -- dedup key for bulk catalog imports (import_catalog.py); rows entered before the
+    -- key existed may repeat it, so keep the oldest copy (NULL codes never conflict)
+    DELETE FROM syllabi a USING syllabi b
+    WHERE a.institution = b.institution AND a.year = b.year
+      AND a.course_code = b.course_code AND a.id > b.id;
+    CREATE UNIQUE INDEX IF NOT EXISTS syllabi_inst_year_code_key
+        ON syllabi (institution, year, course_code);
+    """),
+    (5, "faculty required core areas", """
+    -- a faculty with no rows here has no configured requirements (no eligibility verdict)
+    CREATE TABLE IF NOT EXISTS faculty_required_core_areas (
+        faculty_id TEXT NOT NULL REFERENCES faculties(id) ON DELETE CASCADE,
+        core_area TEXT NOT NULL REFERENCES core_areas(name) ON DELETE CASCADE,
+        PRIMARY KEY (faculty_id, core_area)
+    );
+    DROP TRIGGER IF EXISTS faculty_required_core_areas_bump_data_version ON faculty_required_core_areas;
+    CREATE TRIGGER faculty_required_core_areas_bump_data_version
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON faculty_required_core_areas
+    FOR EACH STATEMENT EXECUTE PROCEDURE bump_data_version();
+    """),
+    (6, "time-bucketed stats aggregates", """
+    CREATE TABLE IF NOT EXISTS stats_daily (
+        day DATE NOT NULL,
+        institution TEXT NOT NULL,
+        year INT NOT NULL,
+        core_area TEXT NOT NULL,
+        count BIGINT NOT NULL DEFAULT 0,
+        PRIMARY KEY (day, institution, year, core_area)
+    );
+    CREATE TABLE IF NOT EXISTS stats_weekly (
+        week DATE NOT NULL,
+        institution TEXT NOT NULL,
+        year INT NOT NULL,
+        core_area TEXT NOT NULL,
+        count BIGINT NOT NULL DEFAULT 0,
+        PRIMARY KEY (week, institution, year, core_area)
+    );
+    -- highest stats.id already merged into stats_daily/stats_weekly
+    CREATE TABLE IF NOT EXISTS stats_watermark (
+        id INT PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+        last_id BIGINT NOT NULL DEFAULT 0,
+        merged_at TIMESTAMPTZ
+    );
+    INSERT INTO stats_watermark (id, last_id) VALUES (1, 0) ON CONFLICT (id) DO NOTHING;
+    CREATE INDEX IF NOT EXISTS stats_created_at_idx ON stats (created_at);
+    """),
+    (7, "example faculty requirements", """
+    -- databases seeded before requirements existed; fresh ones get them from _seed
+    INSERT INTO faculty_required_core_areas (faculty_id, core_area)
+    SELECT f.id, a.name
+    FROM (VALUES """ + ", ".join(f"('{fid}', '{area}')" for fid, area in EXAMPLE_REQUIRED_CORE_AREAS) + """) AS v(faculty_id, core_area)
+    JOIN faculties f ON f.id = v.faculty_id
+    JOIN core_areas a ON a.name = v.core_area
+    WHERE NOT EXISTS (SELECT 1 FROM faculty_required_core_areas)
+    ON CONFLICT DO NOTHING;
+    """),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def schema_version() -> int:
+    """Applied migration version, 0 when the schema_version table does not exist yet."""
+    try:
+        with pooled_cursor(commit=False) as cur:
+            cur.execute("SELECT version FROM schema_version WHERE id = 1;")
+            row = cur.fetchone()
+    except errors.UndefinedTable:
+        return 0
+    return row["version"] if row else 0
+
+
+def migrate(cur) -> Tuple[int, int]:
+    cur.execute("SELECT pg_advisory_xact_lock(%s);", (MIGRATION_LOCK_ID,))
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            id INT PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+            version INT NOT NULL
+        );
+        INSERT INTO schema_version (id, version) VALUES (1, 0) ON CONFLICT (id) DO NOTHING;
+    """)
+    # re-read under the lock: another process may have migrated while we waited
+    cur.execute("SELECT version FROM schema_version WHERE id = 1;")
+    before = cur.fetchone()["version"]
+    for version, description, sql in MIGRATIONS:
+        if version > before:
+            log.info("applying migration %d: %s", version, description)
+            cur.execute(sql)
+    cur.execute("UPDATE schema_version SET version = %s WHERE id = 1;", (max(before, LATEST_VERSION),))
+    return before, LATEST_VERSION
+
+
+def init_db():
     with pooled_cursor() as cur:
-        cur.execute(ddl)
+        migrate(cur)
 
 def seed_if_empty():
     with pooled_cursor() as cur:
-        cur.execute("SELECT COUNT(*) AS c FROM faculties;")
-        if cur.fetchone()["c"] == 0:
-            cur.execute("""
-                INSERT INTO faculties (id, name, email, max_course_age_years) VALUES
-                ('huji','האוניברסיטה העברית – פקולטה לרפואה','corecourses@huji.ac.il',10),
-                ('bgu','אוניברסיטת בן-גוריון – פקולטה למדעי הבריאות','corecourses@bgu.ac.il',11),
-                ('tau','אוניברסיטת תל-אביב – הפקולטה לרפואה','corecourses@tau.ac.il',10);
-            """)
-            cur.executemany("""
-                INSERT INTO faculty_table_fields (faculty_id, field_id, label, position)
-                VALUES (%s,%s,%s,%s)
-            """, [
-                ("huji","applicant_full_name","שם מלא",1),
-                ("huji","id_or_passport","ת.ז/דרכון",2),
-                ("huji","institution","מוסד לימוד",3),
-                ("huji","year","שנה",4),
-                ("huji","course_name","שם הקורס",5),
-                ("huji","core_area","תחום ליבה",6),
-                ("huji","grade","ציון",7),
-                ("bgu","applicant_full_name","שם מלא",1),
-                ("bgu","id_or_passport","ת.ז/דרכון",2),
-                ("bgu","institution","מוסד לימוד",3),
-                ("bgu","year","שנה",4),
-                ("bgu","course_code","מס' קורס",5),
-                ("bgu","course_name","שם הקורס",6),
-                ("bgu","core_area","תחום ליבה",7),
-                ("bgu","grade","ציון",8),
-                ("tau","applicant_full_name","שם מלא",1),
-                ("tau","id_or_passport","ת.ז/דרכון",2),
-                ("tau","institution","מוסד לימוד",3),
-                ("tau","year","שנה",4),
-                ("tau","course_name","שם הקורס",5),
-                ("tau","core_area","תחום ליבה",6),
-                ("tau","grade","ציון",7),
-            ])
-        cur.execute("SELECT COUNT(*) AS c FROM core_areas;")
-        if cur.fetchone()["c"] == 0:
-            cur.executemany("INSERT INTO core_areas (name) VALUES (%s)", [
-                ("כימיה כללית",), ("כימיה אורגנית",), ("ביוכימיה",),
-                ("ביולוגיה של התא",), ("מיקרוביולוגיה",), ("פיזיקה",), ("סטטיסטיקה",)
-            ])
-        cur.execute("SELECT COUNT(*) AS c FROM syllabi;")
-        if cur.fetchone()["c"] == 0:
-            cur.executemany("""
-                INSERT INTO syllabi (institution, year, course_code, course_name, core_area, file_url)
-                VALUES (%s,%s,%s,%s,%s,%s)
-            """, [
-                ("מכללת הדסה", 2022, "HAD-CH101", "כימיה כללית א'", "כימיה כללית", "https://example.com/had/2022/chem101.pdf"),
-                ("מכללת הדסה", 2022, "HAD-CH202", "כימיה אורגנית", "כימיה אורגנית", "https://example.com/had/2022/orgchem.pdf"),
-                ("מכינת אונ' אריאל", 2021, "ARL-BIO110", "ביולוגיה של התא", "ביולוגיה של התא", "https://example.com/ariel/2021/cellbio.pdf"),
-                ("מכינת אונ' בר-אילן", 2019, "BIU-PHY070", "פיזיקה למכינה", "פיזיקה", "https://example.com/biu/2019/physics.pdf"),
-            ])
+        _seed(cur)
+
+def _seed(cur):
+    cur.execute("SELECT COUNT(*) AS c FROM faculties;")
+    if cur.fetchone()["c"] == 0:
+        cur.execute("""
+            INSERT INTO faculties (id, name, email, max_course_age_years) VALUES
+            ('huji','האוניברסיטה העברית – פקולטה לרפואה','corecourses@huji.ac.il',10),
+            ('bgu','אוניברסיטת בן-גוריון – פקולטה למדעי הבריאות','corecourses@bgu.ac.il',11),
+            ('tau','אוניברסיטת תל-אביב – הפקולטה לרפואה','corecourses@tau.ac.il',10);
+        """)
+        cur.executemany("""
+            INSERT INTO faculty_table_fields (faculty_id, field_id, label, position)
+            VALUES (%s,%s,%s,%s)
+        """, [
+            ("huji","applicant_full_name","שם מלא",1),
+            ("huji","id_or_passport","ת.ז/דרכון",2),
+            ("huji","institution","מוסד לימוד",3),
+            ("huji","year","שנה",4),
+            ("huji","course_name","שם הקורס",5),
+            ("huji","core_area","תחום ליבה",6),
+            ("huji","grade","ציון",7),
+            ("bgu","applicant_full_name","שם מלא",1),
+            ("bgu","id_or_passport","ת.ז/דרכון",2),
+            ("bgu","institution","מוסד לימוד",3),
+            ("bgu","year","שנה",4),
+            ("bgu","course_code","מס' קורס",5),
+            ("bgu","course_name","שם הקורס",6),
+            ("bgu","core_area","תחום ליבה",7),
+            ("bgu","grade","ציון",8),
+            ("tau","applicant_full_name","שם מלא",1),
+            ("tau","id_or_passport","ת.ז/דרכון",2),
+            ("tau","institution","מוסד לימוד",3),
+            ("tau","year","שנה",4),
+            ("tau","course_name","שם הקורס",5),
+            ("tau","core_area","תחום ליבה",6),
+            ("tau","grade","ציון",7),
+        ])
+    cur.execute("SELECT COUNT(*) AS c FROM core_areas;")
+    if cur.fetchone()["c"] == 0:
+        cur.executemany("INSERT INTO core_areas (name) VALUES (%s)", [
+            ("כימיה כללית",), ("כימיה אורגנית",), ("ביוכימיה",),
+            ("ביולוגיה של התא",), ("מיקרוביולוגיה",), ("פיזיקה",), ("סטטיסטיקה",)
+        ])
+    cur.execute("SELECT COUNT(*) AS c FROM faculty_required_core_areas;")
+    if cur.fetchone()["c"] == 0:
+        cur.executemany("""
+            INSERT INTO faculty_required_core_areas (faculty_id, core_area)
+            SELECT %s, %s WHERE EXISTS (SELECT 1 FROM faculties WHERE id = %s)
+              AND EXISTS (SELECT 1 FROM core_areas WHERE name = %s)
+        """, [(fid, area, fid, area) for fid, area in EXAMPLE_REQUIRED_CORE_AREAS])
+    cur.execute("SELECT COUNT(*) AS c FROM syllabi;")
+    if cur.fetchone()["c"] == 0:
+        cur.executemany("""
+            INSERT INTO syllabi (institution, year, course_code, course_name, core_area, file_url)
+            VALUES (%s,%s,%s,%s,%s,%s)
+        """, [
+            ("מכללת הדסה", 2022, "HAD-CH101", "כימיה כללית א'", "כימיה כללית", "https://example.com/had/2022/chem101.pdf"),
+            ("מכללת הדסה", 2022, "HAD-CH202", "כימיה אורגנית", "כימיה אורגנית", "https://example.com/had/2022/orgchem.pdf"),
+            ("מכינת אונ' אריאל", 2021, "ARL-BIO110", "ביולוגיה של התא", "ביולוגיה של התא", "https://example.com/ariel/2021/cellbio.pdf"),
+            ("מכינת אונ' בר-אילן", 2019, "BIU-PHY070", "פיזיקה למכינה", "פיזיקה", "https://example.com/biu/2019/physics.pdf"),
+        ])
 
-def ensure_db_ready():
-    init_db()
-    seed_if_empty()
+def ensure_db_ready() -> str:
+    """Migrate and seed only when needed; a warm database costs one SELECT."""
+    if schema_version() >= LATEST_VERSION:
+        return "current"
+    with pooled_cursor() as cur:
+        before, after = migrate(cur)
+        _seed(cur)
+    return f"migrated {before} -> {after}"
@@ -0,0 +1,208 @@
+# snapshot.py
+# Local SQLite copy of the reference data, read when Postgres is down or over its latency budget.
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from psycopg2 import extensions
+
+from columnar import FETCH_CHUNK_ROWS, fetch_chunks, frame_from_chunks
+from data_access import (CORE_AREAS_SQL, DATA_VERSION_SQL, FACULTIES_SQL, FACULTY_FIELDS_SQL,
+                         FACULTY_REQUIREMENTS_SQL, INSTITUTION_YEARS_SQL, SYLLABI_COLUMNS, SYLLABI_SQL,
+                         build_faculties, fetch_data_version, syllabi_page_query, syllabi_page_result)
+from db import DB_UNAVAILABLE_ERRORS, pooled_cursor
+
+SNAPSHOT_PATH = os.getenv("SNAPSHOT_PATH", os.path.join(tempfile.gettempdir(), "core-courses-snapshot.sqlite3"))
+# how often the refresher compares data_version with the snapshot's; 0 disables it
+SNAPSHOT_INTERVAL = float(os.getenv("SNAPSHOT_INTERVAL", "300"))
+# rewritten at least this often even when data_version is unchanged (e.g. after a DB restore)
+SNAPSHOT_MAX_AGE = float(os.getenv("SNAPSHOT_MAX_AGE", str(24 * 3600)))
+
+log = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE faculties (id TEXT PRIMARY KEY, name TEXT, email TEXT, max_course_age_years INTEGER);
+CREATE TABLE faculty_table_fields (faculty_id TEXT, field_id TEXT, label TEXT, position INTEGER);
+CREATE TABLE faculty_required_core_areas (faculty_id TEXT, core_area TEXT);
+CREATE TABLE core_areas (name TEXT PRIMARY KEY);
+CREATE TABLE syllabi (id INTEGER PRIMARY KEY, institution TEXT, year INTEGER, course_code TEXT,
+                      course_name TEXT, core_area TEXT, file_url TEXT);
+"""
+# built after the bulk insert; same order as the keyset index in Postgres
+_INDEXES = "CREATE INDEX syllabi_inst_year_name_idx ON syllabi (institution, year DESC, course_name, id);"
+
+
+class SnapshotUnavailable(RuntimeError):
+    pass
+
+
+def write_snapshot(path: str = SNAPSHOT_PATH) -> int:
+    """Copy the reference tables into a new SQLite file and swap it in atomically; returns its data_version."""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=".snapshot-", suffix=".sqlite3")
+    os.close(fd)
+    try:
+        out = sqlite3.connect(tmp)
+        try:
+            out.executescript("PRAGMA journal_mode = OFF; PRAGMA synchronous = OFF;" + _SCHEMA)
+            with pooled_cursor(commit=False, tuples=True) as cur:
+                # one consistent view of all tables, stamped with the version it reflects
+                cur.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ READ ONLY;")
+                cur.execute(DATA_VERSION_SQL)
+                row = cur.fetchone()
+                version = row[0] if row else 0
+                cur.execute("SELECT id, name, email, max_course_age_years FROM faculties ORDER BY id;")
+                out.executemany("INSERT INTO faculties VALUES (?, ?, ?, ?)", cur.fetchall())
+                cur.execute(FACULTY_FIELDS_SQL)
+                out.executemany("INSERT INTO faculty_table_fields VALUES (?, ?, ?, ?)", cur.fetchall())
+                cur.execute(FACULTY_REQUIREMENTS_SQL)
+                out.executemany("INSERT INTO faculty_required_core_areas VALUES (?, ?)", cur.fetchall())
+                cur.execute(CORE_AREAS_SQL)
+                out.executemany("INSERT INTO core_areas VALUES (?)", cur.fetchall())
+                with cur.connection.cursor("snapshot_syllabi", cursor_factory=extensions.cursor) as syllabi:
+                    syllabi.itersize = FETCH_CHUNK_ROWS
+                    syllabi.execute(SYLLABI_SQL)
+                    for rows in fetch_chunks(syllabi):
+                        out.executemany("INSERT INTO syllabi VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            out.execute(_INDEXES)
+            out.executemany("INSERT INTO meta VALUES (?, ?)",
+                            [("version", str(version)), ("written_at", repr(time.time()))])
+            out.commit()
+        finally:
+            out.close()
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    return version
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    if not os.path.exists(path):
+        raise SnapshotUnavailable(f"no snapshot at {path}")
+    try:
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    except sqlite3.Error as e:
+        raise SnapshotUnavailable(str(e)) from e
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def _query(sql: str, params=(), path: str = SNAPSHOT_PATH) -> list:
+    conn = _connect(path)
+    try:
+        return conn.execute(sql.replace("%s", "?"), params).fetchall()
+    except sqlite3.Error as e:
+        raise SnapshotUnavailable(str(e)) from e
+    finally:
+        conn.close()
+
+
+def snapshot_info(path: str = SNAPSHOT_PATH) -> Optional[Dict[str, Any]]:
+    try:
+        meta = {r["key"]: r["value"] for r in _query("SELECT key, value FROM meta", path=path)}
+    except SnapshotUnavailable:
+        return None
+    written_at = float(meta.get("written_at", 0))
+    return {"path": path, "version": int(meta.get("version", -1)), "written_at": written_at,
+            "age": time.time() - written_at}
+
+
+def _faculties():
+    return build_faculties(_query(FACULTIES_SQL), _query(FACULTY_FIELDS_SQL), _query(FACULTY_REQUIREMENTS_SQL))
+
+
+def _syllabi_df():
+    conn = _connect(SNAPSHOT_PATH)
+    conn.row_factory = None  # plain tuples for the column builder
+    try:
+        cur = conn.execute(SYLLABI_SQL)
+        return frame_from_chunks(fetch_chunks(cur), SYLLABI_COLUMNS)
+    except sqlite3.Error as e:
+        raise SnapshotUnavailable(str(e)) from e
+    finally:
+        conn.close()
+
+
+def _syllabi_page(institution, year_from, year_to, core_area, after, limit):
+    sql, params = syllabi_page_query(institution, year_from, year_to, core_area, after, limit)
+    return syllabi_page_result([dict(r) for r in _query(sql, params)], limit)
+
+
+# same names and arguments as the data_access loaders they stand in for
+_READERS = {
+    "faculties": _faculties,
+    "core_areas": lambda: [r["name"] for r in _query(CORE_AREAS_SQL)],
+    "syllabi_df": _syllabi_df,
+    "institutions": lambda: [r["institution"] for r in
+                             _query("SELECT DISTINCT institution FROM syllabi ORDER BY institution")],
+    "institution_years": lambda institution: [r["year"] for r in _query(INSTITUTION_YEARS_SQL, (institution,))],
+    "syllabi_page": _syllabi_page,
+}
+
+
+def read(name: str, *args):
+    return _READERS[name](*args)
+
+
+class SnapshotRefresher:
+    """Daemon thread that rewrites the snapshot whenever data_version moves past it."""
+
+    def __init__(self, interval: float = SNAPSHOT_INTERVAL, path: str = SNAPSHOT_PATH):
+        self.interval = interval
+        self.path = path
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.writes = 0
+        self.errors = 0
+
+    def start(self):
+        if self.interval > 0 and (self._thread is None or not self._thread.is_alive()):
+            self._thread = threading.Thread(target=self._run, name="snapshot-refresher", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def refresh_if_stale(self) -> bool:
+        info = snapshot_info(self.path)
+        version = fetch_data_version()
+        if info is not None and info["version"] == version and info["age"] < SNAPSHOT_MAX_AGE:
+            return False
+        t0 = time.perf_counter()
+        version = write_snapshot(self.path)
+        self.writes += 1
+        log.info("reference snapshot v%d written to %s in %.2fs", version, self.path, time.perf_counter() - t0)
+        return True
+
+    def _run(self):
+        while True:
+            try:
+                self.refresh_if_stale()
+            except DB_UNAVAILABLE_ERRORS as e:
+                log.warning("snapshot refresh skipped, database unavailable: %s", e)
+            except Exception:
+                self.errors += 1
+                log.exception("snapshot refresh failed")
+            if self._stop.wait(self.interval):
+                return
+
+
+_refresher: Optional[SnapshotRefresher] = None
+_refresher_lock = threading.Lock()
+
+
+def start_snapshot_refresher() -> SnapshotRefresher:
+    global _refresher
+    with _refresher_lock:
+        if _refresher is None:
+            _refresher = SnapshotRefresher()
+        _refresher.start()
+        return _refresher
@@ -0,0 +1,278 @@
+# stats_ingest.py
+import atexit
+import hashlib
+import json
+import logging
+import os
+import queue
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+STATS_BATCH_SIZE = int(os.getenv("STATS_BATCH_SIZE", "500"))
+STATS_FLUSH_INTERVAL = float(os.getenv("STATS_FLUSH_INTERVAL", "2"))
+STATS_QUEUE_MAX = int(os.getenv("STATS_QUEUE_MAX", "10000"))
+STATS_SEEN_KEYS_MAX = int(os.getenv("STATS_SEEN_KEYS_MAX", "100000"))
+# batches that cannot reach the DB are appended here and replayed after the next successful flush
+STATS_SPILL_PATH = os.getenv("STATS_SPILL_PATH", os.path.join(tempfile.gettempdir(), "core-courses-stats-spill.jsonl"))
+STATS_SPILL_MAX_BYTES = int(os.getenv("STATS_SPILL_MAX_BYTES", str(50 * 1024 * 1024)))
+# seconds between analytics.run_maintenance calls after a flush; 0 disables
+ANALYTICS_MERGE_INTERVAL = float(os.getenv("ANALYTICS_MERGE_INTERVAL", "60"))
+
+log = logging.getLogger(__name__)
+
+StatRow = Tuple[str, int, str]
+
+
+def row_keys(session_id: str, rows: List[StatRow]) -> List[str]:
+    """One idempotency key per row: (session, row, occurrence of that row in the list).
+
+    Order-insensitive, and editing one selection only changes the keys of the
+    rows it touched, so rows already counted are never counted again.
+    """
+    seen: Dict[StatRow, int] = {}
+    keys = []
+    for row in rows:
+        n = seen[row] = seen.get(row, 0) + 1
+        payload = json.dumps([session_id, list(row), n], ensure_ascii=False, default=str)
+        keys.append(hashlib.sha256(payload.encode("utf-8")).hexdigest())
+    return keys
+
+
+class StatsWriter:
+    """Background writer that micro-batches stats rows from all sessions.
+
+    `submit` never touches the DB: it drops rows whose key was already seen
+    and enqueues the rest. A daemon thread flushes once `batch_size` rows are
+    buffered or `flush_interval` seconds have passed since the first buffered
+    row, and flushes whatever is left on `stop()` / interpreter exit. After a
+    flush it also schedules the analytics merge, run at most every
+    `merge_interval` seconds. Batches that fail because the DB is unreachable
+    are spilled to a JSONL file (one batch per line) and replayed line by line
+    after the next successful flush; lines the DB rejects for any other reason
+    are moved to `<spill_path>.rejected` so they cannot block the rest.
+    """
+
+    _STOP = object()
+
+    def __init__(self, batch_size: int = STATS_BATCH_SIZE, flush_interval: float = STATS_FLUSH_INTERVAL,
+                 max_queue: int = STATS_QUEUE_MAX, max_seen: int = STATS_SEEN_KEYS_MAX,
+                 merge_interval: float = ANALYTICS_MERGE_INTERVAL, spill_path: str = STATS_SPILL_PATH,
+                 spill_max_bytes: int = STATS_SPILL_MAX_BYTES):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.merge_interval = merge_interval
+        self.spill_path = spill_path
+        self.spill_max_bytes = spill_max_bytes
+        self._merge_due: Optional[float] = None
+        self._last_merge = 0.0
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._seen: "OrderedDict[str, None]" = OrderedDict()
+        self._max_seen = max_seen
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self.submitted = 0
+        self.duplicates = 0
+        self.dropped = 0
+        self.flushes = 0
+        self.flushed_rows = 0
+        self.errors = 0
+        self.merges = 0
+        self.spilled_rows = 0
+        self.replayed_rows = 0
+        self.rejected_rows = 0
+
+    def _ensure_started(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="stats-writer", daemon=True)
+            self._thread.start()
+
+    def submit(self, keyed_rows: List[Tuple[str, StatRow]]) -> bool:
+        """Enqueue (key, row) pairs; False only if the queue is full and nothing was taken."""
+        with self._lock:
+            fresh = [(k, r) for k, r in keyed_rows if k not in self._seen]
+            self.duplicates += len(keyed_rows) - len(fresh)
+            if not fresh:
+                return True
+            for k, _ in fresh:
+                self._seen[k] = None
+            while len(self._seen) > self._max_seen:
+                self._seen.popitem(last=False)
+            self._ensure_started()
+        try:
+            self._queue.put_nowait([r for _, r in fresh])
+        except queue.Full:
+            with self._lock:
+                for k, _ in fresh:
+                    self._seen.pop(k, None)
+                self.dropped += len(fresh)
+            return False
+        with self._lock:
+            self.submitted += len(fresh)
+        return True
+
+    def _run(self):
+        batch: List[StatRow] = []
+        first_at = None
+        while True:
+            deadlines = [d for d in (first_at and first_at + self.flush_interval, self._merge_due) if d]
+            timeout = max(0.0, min(deadlines) - time.monotonic()) if deadlines else None
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+            if item is self._STOP:
+                self._flush(batch)
+                return
+            if item:
+                batch.extend(item)
+                first_at = first_at or time.monotonic()
+            if batch and (len(batch) >= self.batch_size or time.monotonic() - first_at >= self.flush_interval):
+                self._flush(batch)
+                batch, first_at = [], None
+            if self._merge_due is not None and time.monotonic() >= self._merge_due:
+                self._merge()
+
+    def _flush(self, batch: List[StatRow]):
+        if not batch:
+            return
+        from data_access import insert_stat_rows  # lazy import to avoid circulars
+        from db import DB_UNAVAILABLE_ERRORS
+        try:
+            insert_stat_rows(batch)
+        except DB_UNAVAILABLE_ERRORS as e:
+            log.warning("stats flush of %d rows failed, spilling to disk: %s", len(batch), e)
+            with self._lock:
+                self.errors += 1
+            self._spill(batch)
+            return
+        except Exception:
+            # bad data, not a connectivity problem: retrying it later would fail the same way
+            log.exception("stats flush of %d rows failed; dropping them", len(batch))
+            with self._lock:
+                self.errors += 1
+                self.dropped += len(batch)
+            return
+        with self._lock:
+            self.flushes += 1
+            self.flushed_rows += len(batch)
+        self._replay()
+        if self.merge_interval > 0 and self._merge_due is None:
+            self._merge_due = max(time.monotonic(), self._last_merge + self.merge_interval)
+
+    def _spill(self, batch: List[StatRow]):
+        try:
+            if os.path.exists(self.spill_path) and os.path.getsize(self.spill_path) > self.spill_max_bytes:
+                log.error("stats spill file %s is full; dropping %d rows", self.spill_path, len(batch))
+                with self._lock:
+                    self.dropped += len(batch)
+                return
+            with open(self.spill_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(batch, ensure_ascii=False) + "\n")
+        except OSError:
+            log.exception("could not spill %d stats rows", len(batch))
+            return
+        with self._lock:
+            self.spilled_rows += len(batch)
+
+    def _replay(self):
+        replaying = self.spill_path + ".replay"
+        # a .replay file left by an interrupted replay goes first, then whatever was spilled since
+        for _ in range(2):
+            if not os.path.exists(replaying):
+                try:
+                    os.replace(self.spill_path, replaying)
+                except FileNotFoundError:
+                    return
+            if not self._replay_file(replaying):
+                return
+
+    def _replay_file(self, replaying: str) -> bool:
+        """Insert the file's batches one by one; False if the DB became unreachable midway."""
+        from data_access import insert_stat_rows
+        from db import DB_UNAVAILABLE_ERRORS
+        with open(replaying, encoding="utf-8") as f:
+            lines = f.readlines()
+        replayed = 0
+        for i, line in enumerate(lines):
+            try:
+                rows = [tuple(r) for r in json.loads(line)]
+            except ValueError:  # torn last line from a crash mid-write
+                continue
+            try:
+                insert_stat_rows(rows)
+            except DB_UNAVAILABLE_ERRORS as e:
+                log.warning("stats replay stopped after %d rows, will retry: %s", replayed, e)
+                # keep only what has not been inserted, so nothing is counted twice
+                tmp = replaying + ".tmp"
+                with open(tmp, "w", encoding="utf-8") as f:
+                    f.writelines(lines[i:])
+                os.replace(tmp, replaying)
+                with self._lock:
+                    self.replayed_rows += replayed
+                return False
+            except Exception:
+                log.exception("spilled stats batch of %d rows rejected; moved to %s.rejected",
+                              len(rows), self.spill_path)
+                with open(self.spill_path + ".rejected", "a", encoding="utf-8") as f:
+                    f.write(line if line.endswith("\n") else line + "\n")
+                with self._lock:
+                    self.rejected_rows += len(rows)
+                continue
+            replayed += len(rows)
+        os.remove(replaying)
+        if replayed:
+            log.info("replayed %d spilled stats rows", replayed)
+        with self._lock:
+            self.replayed_rows += replayed
+        return True
+
+    def _merge(self):
+        from analytics import run_maintenance  # lazy import to avoid circulars
+        self._merge_due = None
+        self._last_merge = time.monotonic()
+        try:
+            run_maintenance()
+        except Exception:
+            log.exception("stats analytics merge failed")
+            with self._lock:
+                self.errors += 1
+            return
+        with self._lock:
+            self.merges += 1
+
+    def stop(self, timeout: float = 10.0):
+        thread = self._thread
+        if thread is None or not thread.is_alive():
+            return
+        try:
+            self._queue.put(self._STOP, timeout=timeout)
+        except queue.Full:
+            log.warning("stats writer queue full on shutdown; %d rows not flushed", self._queue.qsize())
+            return
+        thread.join(timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "submitted": self.submitted, "duplicates": self.duplicates,
+                "dropped": self.dropped, "flushes": self.flushes,
+                "flushed_rows": self.flushed_rows, "errors": self.errors, "merges": self.merges,
+                "spilled_rows": self.spilled_rows, "replayed_rows": self.replayed_rows,
+                "rejected_rows": self.rejected_rows,
+                "queued": self._queue.qsize(),
+            }
+
+
+_writer = StatsWriter()
+atexit.register(_writer.stop)
+
+
+def enqueue_stat_rows(keyed_rows: List[Tuple[str, StatRow]]) -> bool:
+    return _writer.submit(keyed_rows)
+
+
+def stats_writer_stats() -> Dict[str, Any]:
+    return _writer.stats()
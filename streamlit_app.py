@@ -1,21 +1,33 @@
 # app.py
+import time
+_T0 = time.perf_counter()
 import pandas as pd
 import streamlit as st
 from utils.theme import inject_dark_theme
 
 st.set_page_config(page_title="אישור קורסי ליבה – MVP", page_icon="🧪", layout="wide")
 # inject_dark_theme()
+import uuid
 from datetime import datetime
-from dateutil.relativedelta import relativedelta
 from typing import List, Dict, Any
 
+from db import DB_UNAVAILABLE_ERRORS, get_pool
 from schema import ensure_db_ready
 from data_access import (
-    fetch_faculties, fetch_core_areas, fetch_syllabi_df,
-    insert_stat_rows, course_is_fresh
+    fetch_faculties, fetch_core_areas, fetch_syllabus_catalog,
+    fetch_institutions, fetch_institution_years, fetch_syllabi_page, prefetch_reference_data,
+    DB_BREAKER, db_degraded
 )
+from stats_ingest import enqueue_stat_rows, row_keys
+from applicant_session import current_session, persist_session, remove_upload, store_upload, upload_paths
+from blobstore import BlobTooLarge
+from validation import cached_eligibility_report
 from utils.rtl import inject_rtl_css
-from utils.export import export_faculty_packages
+from utils.timing import StartupTimer
+import query_metrics
+_T_IMPORTS = time.perf_counter()
+
+query_metrics.begin_rerun()
 
 # MUST be first Streamlit call:
 
@@ -23,17 +35,47 @@ inject_rtl_css()
 
 st.title("🧪 מערכת אישור קורסי ליבה – MVP")
 
-# Init DB (DDL + seed) once per process
+# Init DB once per process: migrations/seed run only when schema_version is behind
 @st.cache_resource
-def _boot():
-    ensure_db_ready()
-    return True
-_boot()
+def _boot() -> StartupTimer:
+    timer = StartupTimer(started=_T0)
+    timer.add("imports", _T_IMPORTS - _T0)
+
+    def connect_and_migrate():
+        with timer.phase("connection pool"):
+            get_pool()
+        with timer.phase("schema check") as phase:
+            phase["note"] = ensure_db_ready()
+
+    # only the DB round trips go through the breaker (the reference fetchers guard their own)
+    DB_BREAKER.call(connect_and_migrate)
+    with timer.phase("reference data"):
+        prefetch_reference_data()
+        fetch_faculties(), fetch_core_areas(), fetch_institutions()
+    from snapshot import start_snapshot_refresher
+    start_snapshot_refresher()
+    timer.log_report()
+    return timer
+
+# a failed boot is not cached; while the breaker is open the retry fails fast inside _boot
+try:
+    BOOT_TIMER = _boot()
+except DB_UNAVAILABLE_ERRORS:
+    BOOT_TIMER = None
+
+# Load reference data (served from the process-wide cache in data_access;
+# with DATA_ACCESS_BACKEND=async, missing entries are loaded concurrently)
+prefetch_reference_data()
+try:
+    FACULTIES, FACULTY_LOOKUP = fetch_faculties()
+    CORE_AREAS = fetch_core_areas()
+except DB_UNAVAILABLE_ERRORS:
+    st.error("מסד הנתונים אינו זמין ואין עותק מקומי של הנתונים. נסו שוב בעוד מספר דקות.")
+    st.stop()
 
-# Load reference data
-FACULTIES, FACULTY_LOOKUP = fetch_faculties()
-CORE_AREAS = fetch_core_areas()
-SYLLABI_INDEX = fetch_syllabi_df()
+if BOOT_TIMER is None or db_degraded():
+    st.warning("מסד הנתונים אינו זמין כרגע – הנתונים מוצגים מעותק מקומי ועשויים שלא להיות עדכניים. "
+               "הבחירות נשמרות וייכללו בסטטיסטיקות כשהחיבור יחזור.")
 
 with st.expander("אודות המערכת (MVP)", expanded=False):
     st.markdown("""
@@ -65,30 +107,75 @@ st.divider()
 
 # שלב 2 – בחירת מוסד/שנה/קורסים + העלאת סילבוס מותאם אישית
 st.header("שלב 2 – בחירת קורסי ליבה והוספת סילבוסים")
-institutions = sorted(SYLLABI_INDEX["institution"].unique()) if not SYLLABI_INDEX.empty else []
-inst = st.selectbox("בחר/י מוסד", options=["—"] + institutions)
+search_q = st.text_input("חיפוש קורס לפי שם או מס' קורס (בכל המוסדות)")
+inst = st.selectbox("בחר/י מוסד", options=["—"] + fetch_institutions())
+
+# catalog picks, manual items and upload handles persist across reruns and reloads (?s= token)
+APPLICANT_STATE = current_session()
+user_added_items: List[Dict[str, Any]] = APPLICANT_STATE["manual_items"]
+catalog_items: Dict[str, Dict[str, Any]] = APPLICANT_STATE["catalog_items"]
+chosen_ids: List[int] = []
+shown_ids: List[int] = []
+
+# records of every syllabus this session has seen, so picks survive paging
+seen_syllabi: Dict[int, Dict[str, Any]] = st.session_state.setdefault("seen_syllabi", {})
+
+
+def syllabus_picker(label: str, rows_df: pd.DataFrame, key: str) -> List[int]:
+    for rec in rows_df.to_dict(orient="records"):
+        seen_syllabi[rec["id"]] = rec
+    options = list(dict.fromkeys(st.session_state.get(key, []) + rows_df["id"].tolist()))
+    shown_ids.extend(options)
+    if key not in st.session_state:  # first render, e.g. after a reload: show the persisted picks
+        st.session_state[key] = [sid for sid in options if str(sid) in catalog_items]
+    return st.multiselect(
+        label, options=options, key=key,
+        format_func=lambda sid: f"{seen_syllabi[sid]['course_name']} ({seen_syllabi[sid]['core_area']})",
+    )
+
 
-selected_rows: List[Dict[str, Any]] = []
-user_added_items: List[Dict[str, Any]] = []
-uploaded_files_store: Dict[str, bytes] = {}
+if search_q.strip():
+    # full-text search needs the in-memory catalog; it is only built once someone searches
+    found_df = fetch_syllabus_catalog().search(search_q)
+    st.subheader("תוצאות חיפוש")
+    st.dataframe(found_df.drop(columns=["id"], errors="ignore"), use_container_width=True)
+    chosen_ids += syllabus_picker("בחר/י קורסים מתוצאות החיפוש", found_df, key="pick_search")
 
 if inst != "—":
-    years = sorted(SYLLABI_INDEX[SYLLABI_INDEX["institution"] == inst]["year"].unique(), reverse=True)
-    year_sel = st.selectbox("בחר/י שנה", options=years)
-    inst_df = SYLLABI_INDEX[(SYLLABI_INDEX["institution"] == inst) & (SYLLABI_INDEX["year"] == year_sel)]
+    year_sel = st.selectbox("בחר/י שנה", options=fetch_institution_years(inst))
+    # keyset cursors of the pages visited so far for this institution/year
+    cursors = st.session_state.setdefault("syllabi_pages", {}).setdefault(f"{inst}|{year_sel}", [None])
+    page_df, next_cursor = fetch_syllabi_page(institution=inst, year_from=year_sel, year_to=year_sel,
+                                              after=cursors[-1])
 
     st.subheader("סילבוסים זמינים מהמוסד והשנה שנבחרו")
-    st.dataframe(inst_df.drop(columns=["id"], errors="ignore"), use_container_width=True)
+    st.dataframe(page_df.drop(columns=["id"], errors="ignore"), use_container_width=True)
+    if len(cursors) > 1 or next_cursor is not None:
+        pcol1, pcol2, pcol3 = st.columns([1, 1, 4])
+        with pcol1:
+            if st.button("‹ הקודם", disabled=len(cursors) == 1):
+                cursors.pop()
+                st.rerun()
+        with pcol2:
+            if st.button("הבא ›", disabled=next_cursor is None):
+                cursors.append(next_cursor)
+                st.rerun()
+        with pcol3:
+            st.caption(f"עמוד {len(cursors)}")
 
-    choose = st.multiselect(
-        "בחר/י קורסים להוספה",
-        options=inst_df.index.tolist(),
-        format_func=lambda idx: f"{inst_df.loc[idx, 'course_name']} ({inst_df.loc[idx, 'core_area']})",
-    )
-    for idx in choose:
-        row = inst_df.loc[idx].to_dict()
-        row.update({"grade": ""})
-        selected_rows.append(row)
+    chosen_ids += syllabus_picker("בחר/י קורסים להוספה", page_df, key=f"pick_{inst}_{year_sel}")
+
+# picks on pickers not rendered this run (other institution/year) are kept as they were
+picked = set(chosen_ids)
+before = dict(catalog_items)
+for sid in set(shown_ids):
+    if sid in picked:
+        catalog_items.setdefault(str(sid), {k: (None if pd.isna(v) else v) for k, v in seen_syllabi[sid].items()})
+    else:
+        catalog_items.pop(str(sid), None)
+if catalog_items != before:
+    persist_session()
+selected_rows: List[Dict[str, Any]] = [{**rec, "grade": ""} for rec in catalog_items.values()]
 
 st.markdown("**או הוספה ידנית של סילבוס/ים ממוסדות אחרים**")
 with st.popover("הוספת סילבוס ידני"):
@@ -111,12 +198,17 @@ with st.popover("הוספת סילבוס ידני"):
             "core_area": u_core_area,
             "grade": (u_grade or "").strip(),
         }
-        if uf is not None:
-            key = f"user_pdf_{uf.name}_{datetime.now().timestamp()}"
-            uploaded_files_store[key] = uf.getvalue()
-            item["uploaded_file_key"] = key
-        user_added_items.append(item)
-        st.success("נוסף לרשימה הזמנית למטה. סגרו את ה-popover כדי לראות.")
+        try:
+            if uf is not None:
+                item["uploaded_file_key"] = store_upload(uf)
+            user_added_items.append(item)
+            persist_session()
+            st.success("נוסף לרשימה למטה. סגרו את ה-popover כדי לראות.")
+        except BlobTooLarge as e:
+            st.error(f"הקובץ גדול מדי: {e}")
+    if user_added_items and st.button("ניקוי הפריטים שנוספו ידנית"):
+        user_added_items.clear()
+        persist_session()
 
 # מאחדים בחירות ממדד הסילבוסים + העלאות ידניות
 all_selections = selected_rows + user_added_items
@@ -139,7 +231,7 @@ if all_selections:
             "core_area": st.column_config.SelectboxColumn("תחום ליבה", options=CORE_AREAS),
             "grade": st.column_config.TextColumn("ציון"),
             "file_url": st.column_config.TextColumn("קישור לסילבוס"),
-            "uploaded_file_key": st.column_config.TextColumn("מפתח קובץ (זמני)"),
+            "uploaded_file_key": st.column_config.TextColumn("מפתח קובץ"),
         },
         key="editable_df",
     )
@@ -151,9 +243,24 @@ st.divider()
 
 # שלב 3 – העלאת גיליונות ציונים (אופציונלי)
 st.header("שלב 3 – הוספת גיליון ציונים (אופציונלי)")
-transcript = st.file_uploader("העלאת קובץ PDF של גיליון ציונים", type=["pdf"])
-if transcript is not None:
-    uploaded_files_store["transcript_pdf"] = transcript.getvalue()
+# a new key empties the uploader after the transcript is removed, so it is not stored again
+transcript = st.file_uploader("העלאת קובץ PDF של גיליון ציונים", type=["pdf"],
+                              key=f"transcript_{st.session_state.get('transcript_resets', 0)}")
+# stored once per uploaded file, not re-read on every rerun
+if transcript is not None and APPLICANT_STATE["transcript"] != transcript.file_id:
+    try:
+        store_upload(transcript, key="transcript_pdf")
+        APPLICANT_STATE["transcript"] = transcript.file_id
+        persist_session()
+    except BlobTooLarge as e:
+        st.error(f"הקובץ גדול מדי: {e}")
+elif APPLICANT_STATE["transcript"]:
+    st.caption("גיליון ציונים שהועלה קודם לכן שמור במערכת.")
+if APPLICANT_STATE["transcript"] and st.button("הסרת גיליון הציונים"):
+    APPLICANT_STATE["transcript"] = None
+    remove_upload("transcript_pdf")
+    st.session_state["transcript_resets"] = st.session_state.get("transcript_resets", 0) + 1
+    st.rerun()
 
 st.divider()
 
@@ -167,21 +274,31 @@ for i, f in enumerate(FACULTIES):
             chosen_faculties.append(f["id"])
 
 if selections and chosen_faculties:
-    st.subheader("בדיקת התיישנות הקורסים לפי כללי כל פקולטה")
-    val_tabs = st.tabs([FACULTY_LOOKUP[fid]["name"] for fid in chosen_faculties])
-    for tab, fid in zip(val_tabs, chosen_faculties):
-        with tab:
-            rows = []
-            for s in selections:
-                y = int(s.get("year", 0) or 0)
-                rows.append({
-                    "מוסד": s.get("institution", ""),
-                    "שנה": s.get("year", ""),
-                    "שם הקורס": s.get("course_name", ""),
-                    "תחום ליבה": s.get("core_area", ""),
-                    "בתוקף?": "כן" if course_is_fresh(y, fid) else "לא",
-                })
-            st.dataframe(pd.DataFrame(rows), use_container_width=True)
+    st.subheader("בדיקת תוקף וכיסוי תחומי ליבה לפי כללי כל פקולטה")
+    selections_df = pd.DataFrame(selections)
+    # memoized on the selections/faculties hash: unrelated reruns reuse the same report
+    report = cached_eligibility_report(selections_df, chosen_faculties, FACULTY_LOOKUP, CORE_AREAS)
+    fac_names = {fid: FACULTY_LOOKUP[fid]["name"] for fid in chosen_faculties}
+    matrix = pd.DataFrame({
+        "מוסד": selections_df.get("institution", ""),
+        "שנה": selections_df.get("year", ""),
+        "שם הקורס": selections_df.get("course_name", ""),
+        "תחום ליבה": selections_df.get("core_area", ""),
+        "תחום כפול": report["duplicate"].map({True: "⚠", False: ""}),
+    }, index=selections_df.index)
+    for fid in chosen_faculties:
+        matrix[fac_names[fid]] = report["fresh"][fid].map({True: "✓", False: "✗ לא בתוקף"})
+    st.dataframe(matrix, use_container_width=True)
+
+    summary = report["summary"]
+    st.dataframe(pd.DataFrame({
+        "פקולטה": [fac_names[fid] for fid in chosen_faculties],
+        "קורסים בתוקף": summary["fresh"].to_numpy(),
+        "תחומי ליבה מכוסים": [f"{c}/{r}" if r else "—" for c, r in zip(summary["covered"], summary["required"])],
+        "תחומים חסרים": [", ".join(m) for m in summary["missing"]],
+        "עומד/ת בדרישות?": [("כן" if ok else "לא") if conf else "דרישות לא הוגדרו"
+                            for conf, ok in zip(summary["configured"], summary["eligible"])],
+    }), use_container_width=True, hide_index=True)
 
 st.divider()
 
@@ -194,11 +311,75 @@ ready_to_export = (
     selections and
     chosen_faculties
 )
+
+
+@st.fragment(run_every=1)
+def export_progress(job_key: str):
+    from export_jobs import get_export_queue
+    job = get_export_queue().get(job_key)
+    if job is None or job.finished:
+        st.rerun()
+    st.progress(job.fraction, text=f"בונה חבילות… {job.label}")
+
+
+def export_downloaded():
+    # the archive holds personal details: keep its bytes only until the download is served
+    st.session_state.pop("export_archive", None)
+    st.session_state.pop("export_job", None)
+    st.session_state["export_downloaded"] = True
+
+
 if ready_to_export:
+    # builds run on a background pool; identical input is served from the finished-archive cache
+    export_uploads = upload_paths(APPLICANT_STATE)
+    # catalog rows next to a manual upload carry a NaN key from data_editor; only strings are blob keys
+    missing_files = [sel.get("course_name") or sel["uploaded_file_key"] for sel in selections
+                     if isinstance(sel.get("uploaded_file_key"), str) and sel["uploaded_file_key"]
+                     and sel["uploaded_file_key"] not in export_uploads]
+    if missing_files:
+        st.warning("קבצי הסילבוס של הקורסים הבאים כבר אינם שמורים ולא ייכללו בחבילה – "
+                   "יש להסיר את הקורס ולהוסיף אותו מחדש עם הקובץ: " + ", ".join(map(str, missing_files)))
+    if st.session_state.pop("export_downloaded", False):
+        st.success("הקובץ הורד. ליצירתו מחדש יש ללחוץ שוב על כפתור היצירה.")
     if st.button("יצירת ZIP לכל הפקולטות שנבחרו"):
-        mem_zip = export_faculty_packages(applicant, selections, chosen_faculties, uploaded_files_store, FACULTY_LOOKUP)
-        st.download_button("הורדת הקובץ (ZIP)", data=mem_zip, file_name="core_courses_packages.zip", mime="application/zip")
-        st.success("נוצרו חבילות ההגשה + טיוטות מייל. ניתן להוריד כעת.")
+        from export_jobs import get_export_queue, ExportQueueFull  # deferred until the first export
+        try:
+            job = get_export_queue().submit(applicant, selections, chosen_faculties, export_uploads, FACULTY_LOOKUP)
+            st.session_state["export_job"] = job.key
+        except ExportQueueFull:
+            st.warning("המערכת עמוסה כרגע ביצוא חבילות. נסו שוב בעוד מספר שניות.")
+
+    if st.session_state.get("export_job"):
+        from export_jobs import get_export_queue, export_key
+        job = get_export_queue().get(st.session_state["export_job"])
+        current_key = export_key(applicant, selections, chosen_faculties, export_uploads, FACULTY_LOOKUP)
+        if job is None or job.key != current_key:
+            del st.session_state["export_job"]
+            st.session_state.pop("export_archive", None)
+            if job is None:
+                st.info("תוקף הקובץ שנוצר פג – יש ליצור אותו מחדש.")
+            else:
+                st.info("הנתונים השתנו מאז היצוא האחרון – יש ליצור את הקובץ מחדש.")
+        elif not job.finished:
+            export_progress(job.key)
+        elif job.status == "failed":
+            st.error(f"יצירת הקובץ נכשלה: {job.error}")
+        else:
+            # read once when the job is first shown as done, not on every rerun
+            archive = st.session_state.get("export_archive")
+            if archive is None or archive[0] != job.key:
+                try:
+                    with open(job.path, "rb") as f:
+                        archive = st.session_state["export_archive"] = (job.key, f.read())
+                except FileNotFoundError:  # removed by cleanup after the done check
+                    archive = None
+            if archive is None:
+                del st.session_state["export_job"]
+                st.info("תוקף הקובץ שנוצר פג – יש ליצור אותו מחדש.")
+            else:
+                st.download_button("הורדת הקובץ (ZIP)", data=archive[1], file_name="core_courses_packages.zip",
+                                   mime="application/zip", on_click=export_downloaded)
+                st.success("נוצרו חבילות ההגשה + טיוטות מייל. ניתן להוריד כעת.")
 else:
     st.info("יש למלא פרטים אישיים בסיסיים, לבחור לפחות קורס אחד ולסמן פקולטה אחת לפחות.")
 
@@ -208,14 +389,46 @@ st.divider()
 st.header("סטטיסטיקות (אנונימי)")
 if consent_stats and selections:
     rows_to_insert = [(s.get("institution", "—"), int(s.get("year", 0) or 0), s.get("core_area", "—")) for s in selections]
-    from data_access import insert_stat_rows  # lazy import to avoid circulars
-    insert_stat_rows(rows_to_insert)
+    # each row of this session is counted once; the write happens off-thread
+    submitted = st.session_state.setdefault("stats_submitted_keys", set())
+    keys = row_keys(st.session_state.setdefault("stats_session_id", uuid.uuid4().hex), rows_to_insert)
+    pending = [(k, r) for k, r in zip(keys, rows_to_insert) if k not in submitted]
+    # a full queue leaves them pending for the next rerun
+    if pending and enqueue_stat_rows(pending):
+        submitted.update(k for k, _ in pending)
 
 try:
     from data_access import fetch_stats_agg_df
     agg = fetch_stats_agg_df()
-    st.dataframe(agg, use_container_width=True) if not agg.empty else st.write("טרם נאספו נתונים להצגה.")
+    # a statement, not a conditional expression: Streamlit magic would st.write() the expression's value
+    if agg.empty:
+        st.write("טרם נאספו נתונים להצגה.")
+    else:
+        st.dataframe(agg, use_container_width=True)
+    if not agg.empty:
+        import analytics  # aggregates are merged by the stats writer thread
+        week_top = analytics.top_this_week()
+        if not week_top.empty:
+            st.caption("הנבחרים ביותר השבוע")
+            st.dataframe(week_top, use_container_width=True, hide_index=True)
+        daily = analytics.trend(days=28)
+        if not daily.empty:
+            st.caption("בחירות לפי תחום ליבה – 28 הימים האחרונים")
+            st.line_chart(daily)
 except Exception as e:
     st.warning(f"לא ניתן להציג סטטיסטיקות כרגע: {e}")
 
+if st.query_params.get("admin") == "1":
+    with st.expander("זמני עלייה (startup)", expanded=False):
+        st.code(BOOT_TIMER.report() if BOOT_TIMER else "העלייה לא הושלמה – מסד הנתונים אינו זמין")
+    with st.expander("שאילתות DB", expanded=False):
+        if query_metrics.QUERY_METRICS:
+            st.caption(f"ריצה נוכחית: {query_metrics.METRICS.current_rerun()} | "
+                       f"לכל ריצה: {query_metrics.METRICS.rerun_summary()}")
+            st.dataframe(pd.DataFrame(query_metrics.METRICS.snapshot()), use_container_width=True)
+        else:
+            st.caption("המדידה כבויה. הפעלה: QUERY_METRICS=1")
+
 st.caption("\nמבנה מודולרי: DB מאוחסן בקבצים נפרדים, הקוד קריא וקל לתחזוקה.")
+
+query_metrics.end_rerun()
@@ -0,0 +1,65 @@
+# tests/test_catalog.py
+import pandas as pd
+import pytest
+from catalog import SyllabusCatalog, normalize
+
+
+def catalog(dtype=object):
+    df = pd.DataFrame({
+        "id": [1, 2, 3, 4],
+        "institution": ["מכללת הדסה", "מכללת הדסה", "אונ' אריאל", "אונ' אריאל"],
+        "year": [2022, 2021, 2021, 2020],
+        "course_code": ["HAD-CH101", "HAD-CH202", None, "ARL-PHY1"],
+        "course_name": ["כימיה כללית א'", "כימיה אורגנית", "ביולוגיה של התא", "פיזיקה למכינה"],
+        "core_area": ["כימיה כללית", "כימיה אורגנית", "ביולוגיה של התא", "פיזיקה"],
+        "file_url": [None] * 4,
+    })
+    for col in ("course_code", "course_name"):
+        df[col] = df[col].astype(dtype)
+    return SyllabusCatalog(df)
+
+
+def ids(frame):
+    return sorted(frame["id"].tolist())
+
+
+def test_normalize_folds_hebrew_variants():
+    assert normalize("כִּימְיָה") == "כימיה"
+    assert normalize("קורס-מבוא") == "קורס מבוא"
+    assert normalize("ארץ") == normalize("ארצ")
+    assert normalize(None) == ""
+
+
+def test_search_prefix_matches_every_term():
+    cat = catalog()
+    assert ids(cat.search("כימ")) == [1, 2]
+    assert ids(cat.search("כימיה אורג")) == [2]
+    assert ids(cat.search("")) == []
+
+
+def test_search_by_course_code_with_or_without_separators():
+    cat = catalog()
+    assert ids(cat.search("HAD-CH101")) == [1]
+    assert ids(cat.search("hadch2")) == [2]
+
+
+def test_search_falls_back_to_close_matches():
+    assert ids(catalog().search("ביולוגיא")) == [3]
+
+
+def test_search_respects_limit():
+    assert len(catalog().search("כימיה", limit=1)) == 1
+
+
+@pytest.mark.parametrize("dtype", [object, "string"])
+def test_missing_codes_are_not_indexed(dtype):
+    cat = catalog(dtype)
+    assert ids(cat.search("<NA>")) == []
+    assert ids(cat.search("none")) == []
+    assert ids(cat.search("ביולוגיה")) == [3]
+
+
+def test_empty_catalog():
+    cat = SyllabusCatalog(pd.DataFrame())
+    assert len(cat) == 0
+    assert cat.search("כימיה").empty
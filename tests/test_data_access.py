@@ -0,0 +1,188 @@
+# tests/test_data_access.py
+import psycopg2
+import pytest
+import data_access
+from data_access import CircuitBreaker, Degraded, ReferenceCache
+from db import DatabaseUnavailable
+from pool import PoolTimeout
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(data_access.time, "monotonic", clock)
+    return clock
+
+
+class Loader:
+    def __init__(self, *values):
+        self.values = list(values)
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.values[min(self.calls, len(self.values)) - 1]
+
+
+def fail(error):
+    def fn():
+        raise error
+    return fn
+
+
+# ReferenceCache
+
+def test_entry_is_served_until_its_ttl_runs_out(clock):
+    cache = ReferenceCache(ttl=10)
+    load = Loader("a", "b")
+    assert cache.get("k", load) == "a"
+    clock.now += 9
+    assert cache.get("k", load) == "a"
+    clock.now += 2
+    assert cache.get("k", load) == "b"
+    assert load.calls == 2
+
+
+def test_expired_entry_is_renewed_while_the_version_is_unchanged(clock):
+    version = [1]
+    cache = ReferenceCache(ttl=10, version_fn=lambda: version[0])
+    load = Loader("a", "b")
+    cache.get("k", load)
+    clock.now += 11
+    assert cache.get("k", load) == "a"
+    assert cache.stats()["revalidations"] == 1
+    version[0] = 2
+    clock.now += 11
+    assert cache.get("k", load) == "b"
+    assert load.calls == 2
+
+
+def test_expired_entry_is_served_while_the_version_cannot_be_read(clock):
+    version = [1]
+
+    def version_fn():
+        if version[0] is None:
+            raise DatabaseUnavailable("down")
+        return version[0]
+
+    cache = ReferenceCache(ttl=10, version_fn=version_fn)
+    load = Loader("a", "b")
+    cache.get("k", load)
+    version[0] = None
+    clock.now += 11
+    assert cache.get("k", load) == "a"
+    assert load.calls == 1
+
+
+def test_degraded_values_are_kept_briefly_and_unversioned(clock):
+    cache = ReferenceCache(ttl=1000, version_fn=lambda: 1)
+    load = Loader(Degraded("snapshot"), "fresh")
+    assert cache.get("k", load) == "snapshot"
+    clock.now += data_access.DB_BREAKER_RESET_AFTER + 1
+    assert cache.get("k", load) == "fresh"
+
+
+def test_invalidate_drops_entries_and_skips_stale_stores(clock):
+    cache = ReferenceCache(ttl=10)
+    load = Loader("a", "b")
+    cache.get("k", load)
+    cache.invalidate("k")
+    assert not cache.contains("k")
+
+    def invalidating_loader():
+        cache.invalidate()  # a writer invalidates while the load is in flight
+        return "stale"
+
+    assert cache.get("k", invalidating_loader) == "stale"
+    assert not cache.contains("k")
+
+
+def test_prime_is_refused_after_a_generation_change(clock):
+    cache = ReferenceCache(ttl=10)
+    generation = cache.generation
+    cache.invalidate()
+    assert not cache.prime("k", "stale", version=1, generation=generation)
+    assert cache.prime("k", "fresh", version=1, generation=cache.generation)
+    assert cache.get("k", Loader("unused")) == "fresh"
+
+
+def test_max_entries_evicts_least_recently_used(clock):
+    cache = ReferenceCache(ttl=10, max_entries=2)
+    for key in "abc":
+        cache.get(key, Loader(key))
+    assert not cache.contains("a")
+    assert cache.contains("b") and cache.contains("c")
+
+
+# CircuitBreaker
+
+def test_breaker_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker(failures=2, reset_after=30)
+    for _ in range(2):
+        with pytest.raises(psycopg2.OperationalError):
+            breaker.call(fail(psycopg2.OperationalError()))
+    assert breaker.is_open and breaker.trips == 1
+    load = Loader("x")
+    with pytest.raises(DatabaseUnavailable):
+        breaker.call(load)
+    assert load.calls == 0
+
+
+def test_breaker_success_resets_the_failure_count(clock):
+    breaker = CircuitBreaker(failures=2, reset_after=30)
+    with pytest.raises(psycopg2.OperationalError):
+        breaker.call(fail(psycopg2.OperationalError()))
+    breaker.call(Loader("ok"))
+    with pytest.raises(psycopg2.OperationalError):
+        breaker.call(fail(psycopg2.OperationalError()))
+    assert not breaker.is_open
+
+
+def test_half_open_trial_closes_or_reopens(clock):
+    breaker = CircuitBreaker(failures=1, reset_after=30)
+    with pytest.raises(psycopg2.OperationalError):
+        breaker.call(fail(psycopg2.OperationalError()))
+    clock.now += 31
+    with pytest.raises(psycopg2.OperationalError):
+        breaker.call(fail(psycopg2.OperationalError()))  # the trial fails
+    assert breaker.is_open
+    with pytest.raises(DatabaseUnavailable):
+        breaker.call(Loader("x"))  # reopened: wait another reset_after
+    clock.now += 31
+    assert breaker.call(Loader("ok")) == "ok"
+    assert not breaker.is_open
+
+
+def test_only_one_trial_at_a_time(clock):
+    breaker = CircuitBreaker(failures=1, reset_after=30)
+    with pytest.raises(psycopg2.OperationalError):
+        breaker.call(fail(psycopg2.OperationalError()))
+    clock.now += 31
+    assert breaker._take_trial()
+    assert not breaker._take_trial()
+    clock.now += 31  # the first trial never reported back
+    assert breaker._take_trial()
+
+
+def test_non_db_errors_and_pool_timeouts_release_the_trial(clock):
+    breaker = CircuitBreaker(failures=1, reset_after=30)
+    for error in (ValueError("bug"), PoolTimeout("pool busy")):
+        with pytest.raises(type(error)):
+            breaker.call(fail(error))
+    assert not breaker.is_open  # neither says the DB is down
+
+    with pytest.raises(psycopg2.OperationalError):
+        breaker.call(fail(psycopg2.OperationalError()))
+    clock.now += 31
+    with pytest.raises(PoolTimeout):
+        breaker.call(fail(PoolTimeout("pool busy")))
+    assert breaker.is_open
+    assert breaker.call(Loader("ok")) == "ok"  # the trial was freed for the next caller
@@ -0,0 +1,105 @@
+# tests/test_pool.py
+import threading
+import time
+import pytest
+from psycopg2 import extensions
+from psycopg2.pool import PoolError
+from pool import BlockingConnectionPool, PoolTimeout
+
+
+class FakeConnection:
+    def __init__(self, n):
+        self.n = n
+        self.closed = 0
+        self.rollbacks = 0
+
+    def close(self):
+        self.closed = 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def get_transaction_status(self):
+        return extensions.TRANSACTION_STATUS_IDLE
+
+
+class FakePool(BlockingConnectionPool):
+    def __init__(self, *args, **kwargs):
+        self.opened = []
+        super().__init__(*args, **kwargs)
+
+    def _connect(self):
+        conn = FakeConnection(len(self.opened))
+        self.opened.append(conn)
+        return conn
+
+
+def test_opens_minconn_up_front_and_grows_to_maxconn():
+    pool = FakePool(minconn=1, maxconn=2, timeout=0.1)
+    assert len(pool.opened) == 1
+    a, b = pool.getconn(), pool.getconn()
+    assert a is not b and len(pool.opened) == 2
+    assert pool.metrics()["in_use"] == 2
+
+
+def test_exhausted_pool_times_out():
+    pool = FakePool(minconn=0, maxconn=1, timeout=0.05)
+    pool.getconn()
+    started = time.monotonic()
+    with pytest.raises(PoolTimeout):
+        pool.getconn()
+    assert time.monotonic() - started >= 0.05
+    metrics = pool.metrics()
+    assert metrics["timeouts"] == 1 and metrics["failed_checkouts"] == 1
+
+
+def test_waiter_gets_the_connection_that_is_put_back():
+    pool = FakePool(minconn=0, maxconn=1, timeout=2)
+    held = pool.getconn()
+    got = []
+    waiter = threading.Thread(target=lambda: got.append(pool.getconn()))
+    waiter.start()
+    time.sleep(0.05)
+    assert pool.metrics()["waiting"] == 1
+    pool.putconn(held)
+    waiter.join(1)
+    assert got == [held]
+    assert len(pool.opened) == 1
+
+
+def test_closed_connections_are_replaced():
+    pool = FakePool(minconn=0, maxconn=1, timeout=0.1)
+    conn = pool.getconn()
+    pool.putconn(conn, close=True)
+    assert conn.closed
+    fresh = pool.getconn()
+    assert fresh is not conn
+
+
+def test_connections_past_max_lifetime_are_recycled():
+    pool = FakePool(minconn=0, maxconn=1, timeout=0.1, max_lifetime=0.0)
+    conn = pool.getconn()
+    pool.putconn(conn)
+    assert conn.closed
+    assert pool.metrics()["recycled"] == 1
+
+
+def test_failed_connect_frees_the_slot():
+    pool = FakePool(minconn=0, maxconn=1, timeout=0.1)
+
+    def refuse():
+        raise OSError("refused")
+
+    pool._connect = refuse
+    with pytest.raises(OSError):
+        pool.getconn()
+    assert pool.metrics()["size"] == 0
+
+
+def test_foreign_connection_and_closed_pool_are_rejected():
+    pool = FakePool(minconn=1, maxconn=1, timeout=0.1)
+    with pytest.raises(PoolError):
+        pool.putconn(FakeConnection(99))
+    pool.closeall()
+    with pytest.raises(PoolError):
+        pool.getconn()
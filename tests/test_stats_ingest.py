@@ -0,0 +1,134 @@
+# tests/test_stats_ingest.py
+import json
+import os
+import psycopg2
+import pytest
+import data_access
+from stats_ingest import StatsWriter, row_keys
+
+ROWS = [("מכללת הדסה", 2022, "כימיה כללית"), ("מכללת הדסה", 2022, "פיזיקה")]
+
+
+class FakeDB:
+    """Stands in for data_access.insert_stat_rows."""
+
+    def __init__(self):
+        self.rows = []
+        self.down = False
+        self.reject = set()
+
+    def insert(self, rows):
+        if self.down:
+            raise psycopg2.OperationalError("connection refused")
+        if any(r in self.reject for r in rows):
+            raise psycopg2.DataError("bad row")
+        self.rows.extend(rows)
+
+
+@pytest.fixture
+def db(monkeypatch):
+    db = FakeDB()
+    monkeypatch.setattr(data_access, "insert_stat_rows", db.insert)
+    return db
+
+
+@pytest.fixture
+def writer(tmp_path):
+    return StatsWriter(merge_interval=0, spill_path=str(tmp_path / "spill.jsonl"))
+
+
+def spilled(writer):
+    with open(writer.spill_path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_row_keys_count_repeated_rows_separately():
+    keys = row_keys("s1", [ROWS[0], ROWS[0], ROWS[1]])
+    assert len(set(keys)) == 3
+    assert row_keys("s1", [ROWS[1], ROWS[0]]) == [keys[2], keys[0]]
+    assert row_keys("s2", [ROWS[0]])[0] != keys[0]
+
+
+def test_submit_drops_rows_already_seen(db, writer):
+    keys = row_keys("s", ROWS)
+    assert writer.submit(list(zip(keys, ROWS)))
+    assert writer.submit(list(zip(keys, ROWS)))
+    stats = writer.stats()
+    assert stats["submitted"] == 2 and stats["duplicates"] == 2
+    writer.stop()
+
+
+def test_submit_reports_a_full_queue_and_forgets_its_keys(tmp_path):
+    writer = StatsWriter(max_queue=1, merge_interval=0, spill_path=str(tmp_path / "spill.jsonl"))
+    writer._ensure_started = lambda: None  # no consumer: the queue stays full
+    first, second = row_keys("s", ROWS)
+    assert writer.submit([(first, ROWS[0])])
+    assert not writer.submit([(second, ROWS[1])])
+    assert writer.stats()["dropped"] == 1
+    assert second not in writer._seen
+
+
+def test_unreachable_db_spills_and_the_next_flush_replays(db, writer):
+    db.down = True
+    writer._flush([ROWS[0]])
+    writer._flush([ROWS[1]])
+    assert spilled(writer) == [[list(ROWS[0])], [list(ROWS[1])]]
+
+    db.down = False
+    writer._flush([ROWS[0]])
+    assert db.rows == [ROWS[0], ROWS[0], ROWS[1]]
+    stats = writer.stats()
+    assert stats["spilled_rows"] == 2 and stats["replayed_rows"] == 2
+    assert not os.path.exists(writer.spill_path)
+
+
+def test_bad_batches_are_dropped_not_spilled(db, writer):
+    db.reject.add(ROWS[1])
+    writer._flush(list(ROWS))
+    stats = writer.stats()
+    assert stats["dropped"] == 2 and stats["spilled_rows"] == 0
+    assert db.rows == []
+
+
+def test_replay_quarantines_rejected_lines(db, writer):
+    with open(writer.spill_path, "w", encoding="utf-8") as f:
+        for row in ROWS:
+            f.write(json.dumps([row], ensure_ascii=False) + "\n")
+        f.write('[["torn')  # crash mid-write
+    db.reject.add(ROWS[0])
+    writer._flush([("מכינה", 2020, "סטטיסטיקה")])
+    assert db.rows == [("מכינה", 2020, "סטטיסטיקה"), ROWS[1]]
+    with open(writer.spill_path + ".rejected", encoding="utf-8") as f:
+        assert [json.loads(line) for line in f] == [[list(ROWS[0])]]
+    assert writer.stats()["rejected_rows"] == 1
+
+
+def test_replay_interrupted_by_an_outage_keeps_only_the_rest(db, writer, monkeypatch):
+    with open(writer.spill_path, "w", encoding="utf-8") as f:
+        for row in ROWS:
+            f.write(json.dumps([row], ensure_ascii=False) + "\n")
+    calls = []
+
+    def insert(rows):
+        calls.append(rows)
+        if len(calls) == 3:  # the flush and the first replayed line succeed
+            raise psycopg2.OperationalError("connection lost")
+        db.rows.extend(rows)
+
+    monkeypatch.setattr(data_access, "insert_stat_rows", insert)
+    writer._flush([("מכינה", 2020, "סטטיסטיקה")])
+    with open(writer.spill_path + ".replay", encoding="utf-8") as f:
+        assert [json.loads(line) for line in f] == [[list(ROWS[1])]]
+
+    monkeypatch.setattr(data_access, "insert_stat_rows", db.insert)
+    writer._flush([("מכינה", 2021, "סטטיסטיקה")])
+    assert db.rows.count(ROWS[0]) == 1 and db.rows.count(ROWS[1]) == 1
+    assert writer.stats()["replayed_rows"] == 2
+
+
+def test_background_thread_flushes_on_stop(db, writer):
+    keys = row_keys("s", ROWS)
+    writer.submit(list(zip(keys, ROWS)))
+    writer.stop()
+    assert db.rows == list(ROWS)
+    assert writer.stats()["flushes"] == 1
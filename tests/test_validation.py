@@ -0,0 +1,79 @@
+# tests/test_validation.py
+import numpy as np
+import pandas as pd
+import validation
+
+LOOKUP = {
+    "huji": {"max_course_age_years": 10, "required_core_areas": ["כימיה כללית", "פיזיקה"]},
+    "bgu": {"max_course_age_years": 5, "required_core_areas": ["כימיה כללית"]},
+    "tau": {"max_course_age_years": 10, "required_core_areas": []},
+}
+CORE_AREAS = ["כימיה כללית", "פיזיקה", "סטטיסטיקה"]
+
+
+def selections(*rows):
+    return pd.DataFrame([{"year": y, "core_area": a} for y, a in rows])
+
+
+def test_freshness_matrix_uses_each_faculty_cutoff():
+    df = selections((2020, "פיזיקה"), (2014, "פיזיקה"), (2016, "כימיה כללית"))
+    fresh = validation.freshness_matrix(df, ["huji", "bgu"], LOOKUP, now_year=2026)
+    assert list(fresh.columns) == ["huji", "bgu"]
+    assert fresh["huji"].tolist() == [True, False, True]
+    assert fresh["bgu"].tolist() == [False, False, False]
+
+
+def test_freshness_matrix_accepts_any_year_for_unknown_faculties_and_missing_years():
+    df = pd.DataFrame({"year": [None, "abc", 1990]})
+    fresh = validation.freshness_matrix(df, ["nope", "huji"], LOOKUP, now_year=2026)
+    assert fresh["nope"].all()
+    assert not fresh["huji"].any()
+
+
+def test_eligibility_report_coverage_and_verdicts():
+    df = selections((2020, "כימיה כללית"), (2022, "פיזיקה"), (2010, "פיזיקה"))
+    report = validation.eligibility_report(df, ["huji", "bgu", "tau"], LOOKUP, CORE_AREAS, now_year=2026)
+    summary = report["summary"]
+
+    assert summary.loc["huji", "eligible"]
+    assert summary.loc["huji", "covered"] == 2
+    assert not summary.loc["bgu", "eligible"]  # 2020 is older than bgu's 5 years
+    assert report["missing"]["bgu"] == ["כימיה כללית"]
+    assert report["coverage"].loc["פיזיקה", "huji"] == 1  # the 2010 course is stale
+    assert report["duplicate"].tolist() == [False, True, True]
+
+
+def test_eligibility_report_unconfigured_faculty_gets_no_verdict():
+    df = selections((2024, "סטטיסטיקה"))
+    summary = validation.eligibility_report(df, ["tau"], LOOKUP, CORE_AREAS, now_year=2026)["summary"]
+    assert not summary.loc["tau", "configured"]
+    assert not summary.loc["tau", "eligible"]
+    assert summary.loc["tau", "required"] == 0
+
+
+def test_eligibility_report_runs_registered_rules(monkeypatch):
+    def before_2020(df, faculty_ids, faculty_lookup, now_year=None):
+        old = validation.selection_years(df) < 2020
+        return pd.DataFrame(np.repeat(old[:, None], len(faculty_ids), axis=1),
+                            index=df.index, columns=list(faculty_ids))
+
+    monkeypatch.setitem(validation.RULES, "old", before_2020)
+    df = selections((2018, "פיזיקה"), (2024, "פיזיקה"))
+    report = validation.eligibility_report(df, ["huji"], LOOKUP, CORE_AREAS, now_year=2026)
+    assert report["checks"]["old"]["huji"].tolist() == [True, False]
+
+
+def test_eligibility_report_without_selections_or_faculties():
+    empty = validation.eligibility_report(selections(), ["huji"], LOOKUP, CORE_AREAS, now_year=2026)
+    assert empty["missing"]["huji"] == ["כימיה כללית", "פיזיקה"]
+    none = validation.eligibility_report(selections((2024, "פיזיקה")), [], LOOKUP, CORE_AREAS, now_year=2026)
+    assert none["summary"].empty
+
+
+def test_cached_eligibility_report_reuses_equal_inputs():
+    df = selections((2024, "פיזיקה"))
+    first = validation.cached_eligibility_report(df, ["huji"], LOOKUP, CORE_AREAS)
+    again = validation.cached_eligibility_report(df.copy(), ["huji"], LOOKUP, CORE_AREAS)
+    other = validation.cached_eligibility_report(selections((2024, "כימיה כללית")), ["huji"], LOOKUP, CORE_AREAS)
+    assert again is first
+    assert other is not first
@@ -0,0 +1,88 @@
+# tests/test_xlsx.py
+import csv
+import io
+import zipfile
+import xml.etree.ElementTree as ET
+import numpy as np
+import pandas as pd
+import pytest
+from utils.xlsx import DEFAULT_SHEET_NAME, MIME_TYPES, faculty_table, render_table
+
+HEADERS = ["שם מלא", "שנה", "ציון", "הערה"]
+ROWS = [
+    ["ישראל ישראלי", 2021, 91.5, "כימיה & <ביו>"],
+    ["דנה", 2019, np.nan, None],
+    ["", float("inf"), pd.NA, "x\x01y"],
+]
+# what every format should hold after a round trip: blanks for missing/non-finite values,
+# control characters stripped from text
+EXPECTED = [
+    ["ישראל ישראלי", 2021, 91.5, "כימיה & <ביו>"],
+    ["דנה", 2019, None, None],
+    [None, None, None, "xy"],
+]
+
+ODS_NS = {"table": "urn:oasis:names:tc:opendocument:xmlns:table:1.0",
+          "office": "urn:oasis:names:tc:opendocument:xmlns:office:1.0",
+          "text": "urn:oasis:names:tc:opendocument:xmlns:text:1.0"}
+
+
+def test_xlsx_round_trip():
+    openpyxl = pytest.importorskip("openpyxl")
+    wb = openpyxl.load_workbook(io.BytesIO(render_table(HEADERS, ROWS, fmt="xlsx")))
+    ws = wb.active
+    assert ws.title == DEFAULT_SHEET_NAME
+    assert ws.sheet_view.rightToLeft
+    values = [list(r) for r in ws.iter_rows(values_only=True)]
+    assert values[0] == HEADERS
+    assert values[1:] == EXPECTED
+    assert ws["A1"].font.b
+
+
+def test_ods_round_trip():
+    data = render_table(HEADERS, ROWS, fmt="ods")
+    with zipfile.ZipFile(io.BytesIO(data)) as zf:
+        assert zf.namelist()[0] == "mimetype"
+        assert zf.read("mimetype").decode() == MIME_TYPES["ods"]
+        root = ET.fromstring(zf.read("content.xml"))
+    table = root.find(".//table:table", ODS_NS)
+    assert table.get(f"{{{ODS_NS['table']}}}name") == DEFAULT_SHEET_NAME
+
+    def cell(c):
+        kind = c.get(f"{{{ODS_NS['office']}}}value-type")
+        if kind is None:
+            return None
+        if kind == "float":
+            value = float(c.get(f"{{{ODS_NS['office']}}}value"))
+            return int(value) if value.is_integer() else value
+        return c.find("text:p", ODS_NS).text
+
+    rows = [[cell(c) for c in r.findall("table:table-cell", ODS_NS)]
+            for r in table.findall("table:table-row", ODS_NS)]
+    assert rows[0] == HEADERS
+    assert rows[1:] == EXPECTED
+
+
+def test_csv_round_trip():
+    data = render_table(HEADERS, ROWS, fmt="csv")
+    assert data.startswith("﻿".encode("utf-8"))
+    rows = list(csv.reader(io.StringIO(data.decode("utf-8-sig"))))
+    assert rows[0] == HEADERS
+    assert rows[1:] == [
+        ["ישראל ישראלי", "2021", "91.5", "כימיה & <ביו>"],
+        ["דנה", "2019", "", ""],
+        ["", "", "", "x\x01y"],  # CSV has no illegal characters to strip
+    ]
+
+
+def test_render_table_rejects_unknown_format():
+    with pytest.raises(ValueError):
+        render_table(HEADERS, ROWS, fmt="xls")
+
+
+def test_faculty_table_follows_the_faculty_field_order():
+    faculty = {"table_fields": [{"id": "year", "label": "שנה"}, {"id": "course_name", "label": "שם הקורס"},
+                                {"id": "missing", "label": "לא קיים"}]}
+    headers, values = faculty_table(faculty, [{"course_name": "פיזיקה", "year": 2020, "grade": 90}])
+    assert headers == ["שנה", "שם הקורס"]
+    assert list(values) == [[2020, "פיזיקה"]]
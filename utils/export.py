@@ -1,6 +1,6 @@
 # utils/export.py
-import io, zipfile
-import pandas as pd
+import io, os, zipfile, hashlib
+from utils.xlsx import faculty_table, render_table
 
 
 def make_faculty_table_rows(applicant, selections):
@@ -19,43 +19,110 @@ def make_faculty_table_rows(applicant, selections):
     return rows
 
 
-def export_faculty_packages(applicant, selections, chosen_faculties, uploaded_files, FACULTY_LOOKUP):
+def _email_body(faculty, applicant):
+    return (
+        f"אל: {faculty['email']}\n"
+        f"נושא: אימות קורסי ליבה – {applicant.get('full_name', '')}\n\n"
+        f"שלום,\n\nמצורפת טבלת קורסי ליבה בתבנית המבוקשת + סילבוסים וגיליון ציונים (אם קיים).\n"
+        f"שם: {applicant.get('full_name', '')} | ת.ז/דרכון: {applicant.get('id_or_passport', '')}\n"
+        f"טלפון ליצירת קשר: {applicant.get('phone', '')} | דוא\"ל: {applicant.get('email', '')}\n\n"
+        f"בברכה,\n{applicant.get('full_name', '')}\n"
+    )
+
+
+class _UploadCache:
+    """Content-addressed view over the uploaded files of one export.
+
+    Each upload key is materialized and hashed once; uploads with identical
+    bytes share one entry no matter how many faculties include them. Values
+    that are paths (blob store files) are already content-addressed and are
+    passed through so the archive streams them from disk.
+    """
+
+    def __init__(self, uploaded_files):
+        self._uploaded = uploaded_files
+        self._digest_by_key = {}
+        self._blobs = {}
+
+    def get(self, key):
+        value = self._uploaded[key]
+        if isinstance(value, (str, os.PathLike)):
+            return value
+        digest = self._digest_by_key.get(key)
+        if digest is None:
+            data = bytes(value)
+            digest = hashlib.sha256(data).hexdigest()
+            self._digest_by_key[key] = digest
+            self._blobs.setdefault(digest, data)
+        return self._blobs[digest]
+
+
+def upload_key(sel):
+    """The selection's blob key, or None; data_editor fills catalog rows next to uploads with NaN."""
+    key = sel.get("uploaded_file_key")
+    return key if isinstance(key, str) and key else None
+
+
+def export_steps(selections, chosen_faculties, uploaded_files):
+    """Units of work reported through `progress`: per faculty, its table, each uploaded file and the email."""
+    files = sum(1 for sel in selections if upload_key(sel) in uploaded_files)
+    return len(chosen_faculties) * (2 + files)
+
+
+def write_faculty_packages(zf, applicant, selections, chosen_faculties, uploaded_files, FACULTY_LOOKUP,
+                           table_format="xlsx", progress=None):
+    # the canonical rows are built once; faculties with the same table layout share one sheet
+    rows = make_faculty_table_rows(applicant, selections)
+    table_by_layout = {}
+    uploads = _UploadCache(uploaded_files)
+    total = export_steps(selections, chosen_faculties, uploaded_files)
+    done = 0
+
+    def step(label):
+        nonlocal done
+        done += 1
+        if progress is not None:
+            progress(done, total, label)
+
+    for fid in chosen_faculties:
+        faculty = FACULTY_LOOKUP[fid]
+        headers, values = faculty_table(faculty, rows)
+        layout = tuple((fld["id"], fld["label"]) for fld in faculty["table_fields"])
+        if layout not in table_by_layout:
+            table_by_layout[layout] = render_table(headers, values, fmt=table_format)
+        zf.writestr(f"{fid}/core_courses_{fid}.{table_format}", table_by_layout[layout])
+        step(f"{fid}: טבלה")
+
+        link_list = []
+        for i, sel in enumerate(selections, start=1):
+            key = upload_key(sel)
+            if key and key in uploaded_files:
+                # PDFs are already compressed; DEFLATE only costs CPU here
+                arcname = f"{fid}/syllabi/{i:02d}_{sel['course_name']}.pdf"
+                payload = uploads.get(key)
+                if isinstance(payload, (str, os.PathLike)):
+                    try:
+                        zf.write(payload, arcname, compress_type=zipfile.ZIP_STORED)
+                    except FileNotFoundError:  # blob evicted after the paths were resolved
+                        link_list.append(f"- {sel['course_name']}: הקובץ אינו זמין, יש להעלות אותו מחדש")
+                else:
+                    zf.writestr(arcname, payload, compress_type=zipfile.ZIP_STORED)
+                step(f"{fid}: {sel['course_name']}")
+            elif sel.get("file_url"):
+                link_list.append(f"- {sel['course_name']}: {sel['file_url']}")
+        if link_list:
+            zf.writestr(f"{fid}/syllabi/קישורים_לסילבוסים.txt", "\n".join(link_list))
+
+        zf.writestr(f"{fid}/טיוטת_מייל_{fid}.txt", _email_body(faculty, applicant))
+        step(f"{fid}: טיוטת מייל")
+
+
+def export_faculty_packages(applicant, selections, chosen_faculties, uploaded_files, FACULTY_LOOKUP,
+                            table_format="xlsx"):
     mem_zip = io.BytesIO()
     with zipfile.ZipFile(mem_zip, mode="w", compression=zipfile.ZIP_DEFLATED) as zf:
-        for fid in chosen_faculties:
-            faculty = FACULTY_LOOKUP[fid]
-            rows = make_faculty_table_rows(applicant, selections)
-            df = pd.DataFrame(rows)
-            cols_order = [fld["id"] for fld in faculty["table_fields"] if fld["id"] in df.columns]
-            df = df[cols_order]
-            heb_headers = {fld["id"]: fld["label"] for fld in faculty["table_fields"]}
-            df.rename(columns=heb_headers, inplace=True)
-
-            xlsx_bytes = io.BytesIO()
-            with pd.ExcelWriter(xlsx_bytes, engine="openpyxl") as writer:
-                df.to_excel(writer, index=False, sheet_name="קורסי ליבה")
-            xlsx_bytes.seek(0)
-            zf.writestr(f"{fid}/core_courses_{fid}.xlsx", xlsx_bytes.read())
-
-            link_list = []
-            for i, sel in enumerate(selections, start=1):
-                if sel.get("uploaded_file_key") and sel["uploaded_file_key"] in uploaded_files:
-                    zf.writestr(f"{fid}/syllabi/{i:02d}_{sel['course_name']}.pdf",
-                                uploaded_files[sel["uploaded_file_key"]])
-                elif sel.get("file_url"):
-                    link_list.append(f"- {sel['course_name']}: {sel['file_url']}")
-            if link_list:
-                zf.writestr(f"{fid}/syllabi/קישורים_לסילבוסים.txt", "\n".join(link_list))
-
-            email_body = (
-                f"אל: {faculty['email']}\n"
-                f"נושא: אימות קורסי ליבה – {applicant.get('full_name', '')}\n\n"
-                f"שלום,\n\nמצורפת טבלת קורסי ליבה בתבנית המבוקשת + סילבוסים וגיליון ציונים (אם קיים).\n"
-                f"שם: {applicant.get('full_name', '')} | ת.ז/דרכון: {applicant.get('id_or_passport', '')}\n"
-                f"טלפון ליצירת קשר: {applicant.get('phone', '')} | דוא\"ל: {applicant.get('email', '')}\n\n"
-                f"בברכה,\n{applicant.get('full_name', '')}\n"
-            )
-            zf.writestr(f"{fid}/טיוטת_מייל_{fid}.txt", email_body)
-
+        write_faculty_packages(zf, applicant, selections, chosen_faculties, uploaded_files, FACULTY_LOOKUP,
+                               table_format)
     mem_zip.seek(0)
     return mem_zip
+
@@ -0,0 +1,39 @@
+# utils/timing.py
+import logging
+import time
+from contextlib import contextmanager
+from typing import List, Tuple
+
+log = logging.getLogger("startup")
+
+
+class StartupTimer:
+    """Wall-clock timings of the named phases of a process's first run."""
+
+    def __init__(self, started: float = None):
+        self.started = time.perf_counter() if started is None else started
+        self.finished = None
+        self.phases: List[Tuple[str, float, str]] = []  # (name, seconds, note)
+
+    @contextmanager
+    def phase(self, name: str):
+        t0 = time.perf_counter()
+        result = {"note": ""}
+        try:
+            yield result
+        finally:
+            self.phases.append((name, time.perf_counter() - t0, str(result["note"])))
+
+    def add(self, name: str, seconds: float, note: str = ""):
+        self.phases.append((name, seconds, note))
+
+    def report(self) -> str:
+        total = (self.finished or time.perf_counter()) - self.started
+        width = max([len(name) for name, _, _ in self.phases] + [5])
+        lines = [f"{name:<{width}}  {secs * 1000:8.1f} ms  {note}".rstrip() for name, secs, note in self.phases]
+        lines.append(f"{'total':<{width}}  {total * 1000:8.1f} ms")
+        return "\n".join(lines)
+
+    def log_report(self):
+        self.finished = self.finished or time.perf_counter()
+        log.info("startup timing:\n%s", self.report())
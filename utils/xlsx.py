@@ -0,0 +1,207 @@
+# utils/xlsx.py
+# Minimal spreadsheet writers for the faculty core-course tables: rows are
+# streamed straight into the archive members, no pandas/openpyxl involved.
+import csv, io, math, numbers, re, zipfile
+from xml.sax.saxutils import escape, quoteattr
+
+DEFAULT_SHEET_NAME = "קורסי ליבה"
+FORMATS = ("xlsx", "ods", "csv")
+MIME_TYPES = {
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "ods": "application/vnd.oasis.opendocument.spreadsheet",
+    "csv": "text/csv",
+}
+
+_ILLEGAL_XML = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]")
+_ILLEGAL_SHEET_CHARS = re.compile(r"[\[\]:*?/\\]")
+
+
+def faculty_table(faculty, rows):
+    """Column labels and value rows in the faculty's own order (`table_fields`)."""
+    available = rows[0].keys() if rows else ()
+    fields = [fld for fld in faculty["table_fields"] if fld["id"] in available]
+    headers = [fld["label"] for fld in fields]
+    values = ([row.get(fld["id"], "") for fld in fields] for row in rows)
+    return headers, values
+
+
+def _text(value):
+    return escape(_ILLEGAL_XML.sub("", str(value)))
+
+
+def _is_number(value):
+    return isinstance(value, numbers.Real) and not isinstance(value, bool)
+
+
+def _is_blank(value):
+    # None, "", NaN/inf (no valid <v> for them), and pandas' missing markers
+    if value is None or (isinstance(value, str) and value == ""):
+        return True
+    if _is_number(value):
+        return not math.isfinite(value)
+    try:
+        return bool(value != value)  # NaT
+    except TypeError:  # pd.NA refuses truth testing
+        return True
+
+
+def _col_letter(idx):
+    letters = ""
+    idx += 1
+    while idx:
+        idx, rem = divmod(idx - 1, 26)
+        letters = chr(65 + rem) + letters
+    return letters
+
+
+def _sheet_name(name):
+    return _ILLEGAL_SHEET_CHARS.sub("_", name)[:31] or "Sheet1"
+
+
+_XLSX_STATIC = {
+    "[Content_Types].xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+        '</Types>'
+    ),
+    "_rels/.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    "xl/_rels/workbook.xml.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+        '<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>'
+        '</Relationships>'
+    ),
+    # style 0: default, style 1: bold header (what pandas' to_excel produced)
+    "xl/styles.xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+        '<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font>'
+        '<font><b/><sz val="11"/><name val="Calibri"/></font></fonts>'
+        '<fills count="2"><fill><patternFill patternType="none"/></fill><fill><patternFill patternType="gray125"/></fill></fills>'
+        '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+        '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+        '<cellXfs count="2"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+        '<xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/></cellXfs>'
+        '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+        '</styleSheet>'
+    ),
+}
+
+
+def _xlsx_row(r, values, style=0):
+    cells = []
+    style_attr = f' s="{style}"' if style else ""
+    for c, value in enumerate(values):
+        ref = f"{_col_letter(c)}{r}"
+        if _is_blank(value):
+            continue
+        if _is_number(value):
+            cells.append(f'<c r="{ref}"{style_attr}><v>{value}</v></c>')
+        else:
+            cells.append(f'<c r="{ref}"{style_attr} t="inlineStr"><is><t xml:space="preserve">{_text(value)}</t></is></c>')
+    return f'<row r="{r}">{"".join(cells)}</row>'
+
+
+def write_xlsx(out, headers, rows, sheet_name=DEFAULT_SHEET_NAME, rtl=True):
+    """Write a single-sheet workbook to `out` (path or binary file object)."""
+    with zipfile.ZipFile(out, mode="w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for name, xml in _XLSX_STATIC.items():
+            zf.writestr(name, xml)
+        zf.writestr("xl/workbook.xml", (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+            'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+            f'<bookViews><workbookView/></bookViews><sheets><sheet name={quoteattr(_sheet_name(sheet_name))} sheetId="1" r:id="rId1"/></sheets>'
+            '</workbook>'
+        ))
+        rtl_attr = ' rightToLeft="1"' if rtl else ""
+        with zf.open("xl/worksheets/sheet1.xml", mode="w") as sheet:
+            sheet.write((
+                '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                f'<sheetViews><sheetView workbookViewId="0"{rtl_attr}/></sheetViews>'
+                '<sheetData>'
+            ).encode("utf-8"))
+            sheet.write(_xlsx_row(1, headers, style=1).encode("utf-8"))
+            for r, values in enumerate(rows, start=2):
+                sheet.write(_xlsx_row(r, values).encode("utf-8"))
+            sheet.write(b"</sheetData></worksheet>")
+
+
+_ODS_MANIFEST = (
+    '<?xml version="1.0" encoding="UTF-8"?>'
+    '<manifest:manifest xmlns:manifest="urn:oasis:names:tc:opendocument:xmlns:manifest:1.0" manifest:version="1.2">'
+    '<manifest:file-entry manifest:full-path="/" manifest:media-type="application/vnd.oasis.opendocument.spreadsheet"/>'
+    '<manifest:file-entry manifest:full-path="content.xml" manifest:media-type="text/xml"/>'
+    '</manifest:manifest>'
+)
+
+
+def _ods_row(values):
+    cells = []
+    for value in values:
+        if _is_blank(value):
+            cells.append("<table:table-cell/>")
+        elif _is_number(value):
+            cells.append(f'<table:table-cell office:value-type="float" office:value="{value}"><text:p>{value}</text:p></table:table-cell>')
+        else:
+            cells.append(f'<table:table-cell office:value-type="string"><text:p>{_text(value)}</text:p></table:table-cell>')
+    return f'<table:table-row>{"".join(cells)}</table:table-row>'
+
+
+def write_ods(out, headers, rows, sheet_name=DEFAULT_SHEET_NAME, rtl=True):
+    with zipfile.ZipFile(out, mode="w", compression=zipfile.ZIP_DEFLATED) as zf:
+        # the mimetype member must come first and be stored uncompressed
+        zf.writestr("mimetype", MIME_TYPES["ods"], compress_type=zipfile.ZIP_STORED)
+        zf.writestr("META-INF/manifest.xml", _ODS_MANIFEST)
+        writing_mode = "rl-tb" if rtl else "lr-tb"
+        with zf.open("content.xml", mode="w") as content:
+            content.write((
+                '<?xml version="1.0" encoding="UTF-8"?>'
+                '<office:document-content xmlns:office="urn:oasis:names:tc:opendocument:xmlns:office:1.0" '
+                'xmlns:style="urn:oasis:names:tc:opendocument:xmlns:style:1.0" '
+                'xmlns:table="urn:oasis:names:tc:opendocument:xmlns:table:1.0" '
+                'xmlns:text="urn:oasis:names:tc:opendocument:xmlns:text:1.0" office:version="1.2">'
+                '<office:automatic-styles><style:style style:name="ta1" style:family="table">'
+                f'<style:table-properties table:display="true" style:writing-mode="{writing_mode}"/>'
+                '</style:style></office:automatic-styles>'
+                f'<office:body><office:spreadsheet><table:table table:name={quoteattr(sheet_name)} table:style-name="ta1">'
+            ).encode("utf-8"))
+            content.write(_ods_row(headers).encode("utf-8"))
+            for values in rows:
+                content.write(_ods_row(values).encode("utf-8"))
+            content.write(b"</table:table></office:spreadsheet></office:body></office:document-content>")
+
+
+def write_csv(out, headers, rows, **_):
+    # BOM so that Excel detects UTF-8 and shows the Hebrew labels correctly
+    text = io.TextIOWrapper(out, encoding="utf-8-sig", newline="", write_through=True)
+    try:
+        writer = csv.writer(text)
+        writer.writerow(headers)
+        # blank the same cells the XLSX/ODS writers leave empty, instead of "nan"/"<NA>"/"inf"
+        writer.writerows(["" if _is_blank(v) else v for v in values] for values in rows)
+    finally:
+        text.detach()
+
+
+WRITERS = {"xlsx": write_xlsx, "ods": write_ods, "csv": write_csv}
+
+
+def render_table(headers, rows, fmt="xlsx", sheet_name=DEFAULT_SHEET_NAME, rtl=True) -> bytes:
+    if fmt not in WRITERS:
+        raise ValueError(f"unsupported table format {fmt!r}; expected one of {FORMATS}")
+    buf = io.BytesIO()
+    WRITERS[fmt](buf, headers, rows, sheet_name=sheet_name, rtl=rtl)
+    return buf.getvalue()
@@ -0,0 +1,185 @@
+# validation.py
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence
+import numpy as np
+import pandas as pd
+
+ELIGIBILITY_CACHE_SIZE = int(os.getenv("ELIGIBILITY_CACHE_SIZE", "256"))
+
+# Per-faculty rules. Each rule gets the selections frame, the chosen faculty ids,
+# FACULTY_LOOKUP and the reference year, and returns a boolean frame: one row per
+# selection, one column per faculty. `eligibility_report` runs every registered rule.
+Rule = Callable[[pd.DataFrame, List[str], dict, Optional[int]], pd.DataFrame]
+
+
+def selection_years(selections: pd.DataFrame) -> np.ndarray:
+    if "year" not in selections.columns:
+        return np.zeros(len(selections), dtype=np.int64)
+    years = pd.to_numeric(selections["year"], errors="coerce").fillna(0)
+    return years.to_numpy(dtype=np.int64)
+
+
+def selection_areas(selections: pd.DataFrame) -> np.ndarray:
+    if "core_area" not in selections.columns:
+        return np.full(len(selections), "", dtype=object)
+    return selections["core_area"].fillna("").astype(str).to_numpy(dtype=object)
+
+
+def required_areas(faculty_id: str, faculty_lookup: dict) -> List[str]:
+    # empty when the faculty's requirements are not configured
+    return list(faculty_lookup.get(faculty_id, {}).get("required_core_areas") or [])
+
+
+def freshness_cutoffs(faculty_ids: List[str], faculty_lookup: dict,
+                      now_year: Optional[int] = None) -> np.ndarray:
+    # same cutoff as datetime.now() - relativedelta(years=n), taken by year;
+    # unknown faculties accept any year (as course_is_fresh did)
+    now_year = now_year or datetime.now().year
+    return np.array([
+        now_year - faculty_lookup[fid]["max_course_age_years"] if fid in faculty_lookup else np.iinfo(np.int64).min
+        for fid in faculty_ids
+    ], dtype=np.int64)
+
+
+def freshness_matrix(selections: pd.DataFrame, faculty_ids: List[str], faculty_lookup: dict,
+                     now_year: Optional[int] = None) -> pd.DataFrame:
+    years = selection_years(selections)
+    cutoffs = freshness_cutoffs(faculty_ids, faculty_lookup, now_year)
+    fresh = years[:, None] >= cutoffs[None, :]
+    return pd.DataFrame(fresh, index=selections.index, columns=list(faculty_ids))
+
+
+def coverage_matrix(selections: pd.DataFrame, faculty_ids: List[str], faculty_lookup: dict,
+                    now_year: Optional[int] = None) -> pd.DataFrame:
+    # fresh selections in one of the faculty's required core areas
+    fresh = freshness_matrix(selections, faculty_ids, faculty_lookup, now_year).to_numpy(dtype=bool)
+    areas = selection_areas(selections)
+    required_sets = [set(required_areas(fid, faculty_lookup)) for fid in faculty_ids]
+    required = np.array([[a in req for req in required_sets] for a in areas],
+                        dtype=bool).reshape(len(areas), len(faculty_ids))
+    return pd.DataFrame(fresh & required, index=selections.index, columns=list(faculty_ids))
+
+
+def duplicate_areas(selections: pd.DataFrame) -> np.ndarray:
+    # another selection has the same core area
+    areas = selection_areas(selections)
+    return pd.Series(areas).duplicated(keep=False).to_numpy() & (areas != "")
+
+
+def duplicate_matrix(selections: pd.DataFrame, faculty_ids: List[str], faculty_lookup: dict,
+                     now_year: Optional[int] = None) -> pd.DataFrame:
+    # the same for every faculty
+    dup = duplicate_areas(selections)
+    return pd.DataFrame(np.repeat(dup[:, None], len(faculty_ids), axis=1),
+                        index=selections.index, columns=list(faculty_ids))
+
+
+RULES: Dict[str, Rule] = {
+    "fresh": freshness_matrix,
+    "covers": coverage_matrix,
+    "duplicate": duplicate_matrix,
+}
+
+
+def validate_selections(selections: pd.DataFrame, faculty_ids: List[str], faculty_lookup: dict,
+                        rules: Optional[Dict[str, Rule]] = None,
+                        now_year: Optional[int] = None) -> Dict[str, pd.DataFrame]:
+    rules = RULES if rules is None else rules
+    return {name: rule(selections, faculty_ids, faculty_lookup, now_year) for name, rule in rules.items()}
+
+
+def eligibility_report(selections: pd.DataFrame, faculty_ids: List[str], faculty_lookup: dict,
+                       core_areas: Sequence[str], now_year: Optional[int] = None) -> Dict[str, Any]:
+    """Run every rule in RULES and reduce the results to a per-faculty verdict.
+
+    Returns
+      checks     rule name -> bool frame, selections x faculties (see validate_selections)
+      fresh      checks["fresh"]
+      duplicate  bool series per selection: another selection has the same core area
+      coverage   int frame, core areas x faculties: fresh selections in that area
+      required   bool frame, core areas x faculties
+      missing    faculty id -> required areas without a fresh selection
+      summary    one row per faculty: fresh/stale/required/covered counts, missing, configured, eligible
+
+    Faculties without rows in faculty_required_core_areas are `configured=False`
+    and never `eligible`: there is nothing to judge the selections against.
+    """
+    checks = validate_selections(selections, faculty_ids, faculty_lookup, now_year=now_year)
+    fresh, covers = checks["fresh"], checks["covers"]
+    areas = selection_areas(selections)
+    required_by_fac = {fid: required_areas(fid, faculty_lookup) for fid in faculty_ids}
+    universe = list(dict.fromkeys([*core_areas, *(a for req in required_by_fac.values() for a in req),
+                                   *(a for a in areas if a)]))
+    area_pos = {a: i for i, a in enumerate(universe)}
+
+    # selections x areas one-hot; per-area counts are a single matrix product with a rule's frame
+    onehot = np.zeros((len(areas), len(universe)), dtype=np.int64)
+    known = np.array([a in area_pos for a in areas], dtype=bool)
+    if known.any():
+        onehot[np.flatnonzero(known), [area_pos[a] for a in areas[known]]] = 1
+    counts = onehot.T @ fresh.to_numpy(dtype=np.int64)
+    covered = (onehot.T @ covers.to_numpy(dtype=np.int64)) > 0
+    required_sets = [set(required_by_fac[fid]) for fid in faculty_ids]
+    required = np.array([[a in req for req in required_sets] for a in universe],
+                        dtype=bool).reshape(len(universe), len(faculty_ids))
+    missing_mask = required & ~covered
+
+    coverage = pd.DataFrame(counts, index=universe, columns=list(faculty_ids))
+    required_df = pd.DataFrame(required, index=universe, columns=list(faculty_ids))
+    missing = {fid: [universe[i] for i in np.flatnonzero(missing_mask[:, j])] for j, fid in enumerate(faculty_ids)}
+    duplicate = pd.Series(duplicate_areas(selections), index=selections.index)
+    n_fresh = fresh.to_numpy().sum(axis=0)
+    configured = np.array([bool(required_by_fac[fid]) for fid in faculty_ids], dtype=bool)
+    summary = pd.DataFrame({
+        "fresh": n_fresh,
+        "stale": len(selections) - n_fresh,
+        "required": required.sum(axis=0),
+        "covered": (required & covered).sum(axis=0),
+        "missing": [missing[fid] for fid in faculty_ids],
+        "configured": configured,
+        "eligible": configured & ~missing_mask.any(axis=0),
+    }, index=list(faculty_ids))
+    return {"checks": checks, "fresh": fresh, "duplicate": duplicate, "coverage": coverage,
+            "required": required_df, "missing": missing, "summary": summary}
+
+
+def _eligibility_key(selections: pd.DataFrame, faculty_ids: List[str], faculty_lookup: dict,
+                     core_areas: Sequence[str], now_year: int) -> str:
+    # only the fields the report depends on; renaming a course does not invalidate it
+    payload = json.dumps([
+        selection_years(selections).tolist(), selection_areas(selections).tolist(), list(selections.index),
+        [[fid, faculty_lookup.get(fid, {}).get("max_course_age_years"),
+          faculty_lookup.get(fid, {}).get("required_core_areas")] for fid in faculty_ids],
+        list(core_areas), now_year,
+    ], ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+_eligibility_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_eligibility_lock = threading.Lock()
+
+
+def cached_eligibility_report(selections: pd.DataFrame, faculty_ids: List[str], faculty_lookup: dict,
+                              core_areas: Sequence[str]) -> Dict[str, Any]:
+    """`eligibility_report`, memoized process-wide on a hash of its inputs.
+
+    The returned frames are shared between sessions and must not be modified.
+    """
+    now_year = datetime.now().year
+    key = _eligibility_key(selections, faculty_ids, faculty_lookup, core_areas, now_year)
+    with _eligibility_lock:
+        report = _eligibility_cache.get(key)
+        if report is not None:
+            _eligibility_cache.move_to_end(key)
+            return report
+    report = eligibility_report(selections, faculty_ids, faculty_lookup, core_areas, now_year)
+    with _eligibility_lock:
+        _eligibility_cache[key] = report
+        while len(_eligibility_cache) > ELIGIBILITY_CACHE_SIZE:
+            _eligibility_cache.popitem(last=False)
+    return report